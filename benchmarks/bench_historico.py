@@ -0,0 +1,143 @@
+"""
+Benchmark do histórico horário de indicadores.
+
+Monta ``dias`` de snapshots horários (uma tabela por estação e uma por
+regional a cada hora; o último dia hora a hora via ``gravar_historico``) e
+mede a gravação de uma hora, o tamanho em disco e as consultas de
+tendência da página (leitura do período + sparklines + gráfico por
+regional), que devem ficar abaixo de um segundo.
+
+Execute a partir da raiz do repositório:
+    python -m benchmarks.bench_historico
+    python -m benchmarks.bench_historico --dias 180 --estacoes 300
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.dados_sinteticos import OPERACOES, REGIONAIS
+from utils.historico import (
+    NIVEIS_HISTORICO,
+    gravar_historico,
+    ler_historico,
+    pivotar_tendencia,
+    series_tendencia,
+    tabela_historico,
+)
+
+PERIODOS = [7, 30, 90]
+REPETICOES = 3
+
+
+def tabelas_sinteticas(estacoes: int, rng: np.random.Generator) -> dict:
+    """Tabelas no formato de ``montar_tabelas`` (só as colunas gravadas)."""
+    operacoes = np.array(OPERACOES)[np.arange(estacoes) % len(OPERACOES)]
+
+    def kpis(linhas: int) -> dict:
+        return {
+            "Total": rng.integers(0, 5000, linhas),
+            "% CPT": rng.uniform(0, 100, linhas).round(2),
+            "% ETA": rng.uniform(0, 100, linhas).round(2),
+            "%Cancel Nok": rng.uniform(0, 1, linhas).round(2),
+        }
+
+    regionais = pd.MultiIndex.from_product([OPERACOES, REGIONAIS]).to_frame(index=False)
+    return {
+        "detalhado": pd.DataFrame({
+            "Operação": operacoes,
+            "Estação": [f"{op}-EST{i:04d}" for i, op in enumerate(operacoes)],
+            **kpis(estacoes),
+        }),
+        "regional": pd.DataFrame({
+            "Operação": regionais[0],
+            "Regional": regionais[1],
+            **kpis(len(regionais)),
+        }),
+    }
+
+
+def _medir(funcao) -> float:
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def _gravar_dia(caminho: str, horas: pd.DatetimeIndex, estacoes: int, rng: np.random.Generator):
+    """Grava um dia inteiro de uma vez (mesmo conteúdo de 24 ``gravar_historico``)."""
+    tabelas = [tabelas_sinteticas(estacoes, rng) for _ in horas]
+    for nivel, (chave, grupo_col) in NIVEIS_HISTORICO.items():
+        dia = pd.concat(
+            [tabela_historico(t[chave], grupo_col, hora) for t, hora in zip(tabelas, horas)],
+            ignore_index=True,
+        )
+        os.makedirs(os.path.join(caminho, nivel), exist_ok=True)
+        dia.to_parquet(
+            os.path.join(caminho, nivel, f"{horas[0]:%Y-%m-%d}.parquet"), index=False, compression="zstd"
+        )
+
+
+def executar(dias: int, estacoes: int, caminho: str) -> dict:
+    rng = np.random.default_rng(0)
+    agora = pd.Timestamp.now(tz="UTC").floor("D") - pd.Timedelta(hours=1)
+    horas = pd.date_range(end=agora, periods=dias * 24, freq="h")
+
+    anteriores, ultimo_dia = horas[:-24], horas[-24:]
+    for inicio in range(0, len(anteriores), 24):
+        _gravar_dia(caminho, anteriores[inicio:inicio + 24], estacoes, rng)
+    inicio = time.perf_counter()
+    for hora in ultimo_dia:
+        gravar_historico(tabelas_sinteticas(estacoes, rng), hora, caminho)
+    gravacao = (time.perf_counter() - inicio) / len(ultimo_dia)
+
+    tamanho = sum(
+        os.path.getsize(os.path.join(raiz, nome))
+        for raiz, _, nomes in os.walk(caminho) for nome in nomes
+    )
+    kpis = ["% CPT", "% ETA", "%Cancel Nok"]
+    consultas = {}
+    for periodo in PERIODOS:
+        def consultar():
+            series_tendencia(ler_historico("estacao", caminho, periodo, agora=agora), kpis, periodo)
+            pivotar_tendencia(ler_historico("regional", caminho, periodo, agora=agora), kpis[0], periodo)
+        consultas[periodo] = _medir(consultar)
+
+    return {
+        "dias": dias,
+        "estacoes": estacoes,
+        "linhas": sum(len(ler_historico(nivel, caminho)) for nivel in NIVEIS_HISTORICO),
+        "gravacao_ms": gravacao * 1000,
+        "disco_mb": tamanho / 1024 ** 2,
+        "consultas": consultas,
+    }
+
+
+def imprimir(resultado: dict):
+    print(
+        f"\n{resultado['dias']} dias × 24 h, {resultado['estacoes']} estações: "
+        f"{resultado['linhas']:,} linhas, {resultado['disco_mb']:.1f} MB em disco"
+    )
+    print(f"Gravação de uma hora: {resultado['gravacao_ms']:.1f} ms")
+    print(f"{'período':>9} {'consulta (s)':>13}")
+    for periodo, segundos in resultado["consultas"].items():
+        print(f"{periodo:>7} d {segundos:>13.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dias", type=int, default=90)
+    parser.add_argument("--estacoes", type=int, default=150)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as caminho:
+        imprimir(executar(args.dias, args.estacoes, caminho))
+
+
+if __name__ == "__main__":
+    main()
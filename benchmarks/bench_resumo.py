@@ -0,0 +1,190 @@
+"""
+Benchmark do caminho de dados do Resumo Geral.
+
+Mede tempo e pico de memória de cada etapa (preparar_dados, cubo, tabelas,
+ordenação de colunas e estilos) com viagens sintéticas de 10 mil, 100 mil e
+1 milhão de linhas. Os estilos são medidos nas duas formas, na mesma
+execução: ``Styler.background_gradient`` (original) e o CSS pré-calculado
+por ``estilos_gradiente`` usado pela página. O resultado pode ser salvo em
+JSON e comparado com o de outro commit.
+
+Execute a partir da raiz do repositório:
+    python -m benchmarks.bench_resumo --json depois.json
+    python -m benchmarks.bench_resumo --linhas 10000 100000 --comparar antes.json
+"""
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.dados_sinteticos import gerar_viagens
+from utils.agregacoes import (
+    criar_cubo,
+    criar_pivot_por_operacao,
+    criar_tabela_detalhada,
+    criar_tabela_detalhada_por_grupo,
+)
+from utils.data_loader import preparar_dados
+from utils.resumo_geral import (
+    ORDEM_COLUNAS,
+    estilos_gradiente,
+    montar_tabelas,
+    ordenar_colunas,
+    tabela_por_operacao,
+)
+
+LINHAS_PADRAO = [10_000, 100_000, 1_000_000]
+
+# Execucoes cronometradas por etapa (vale a menor)
+REPETICOES = 3
+
+
+def medir(funcao, *args, repeticoes: int = REPETICOES):
+    """
+    Cronometra ``funcao`` (menor de ``repeticoes``) e mede o pico em uma
+    execução separada, com tracemalloc, para não distorcer o tempo.
+
+    Returns:
+        Tupla (resultado, segundos, pico de memória alocada em MB)
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        tempos.append(time.perf_counter() - inicio)
+        del resultado
+    segundos = min(tempos)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        resultado = funcao(*args)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return resultado, segundos, pico / 1024 ** 2
+
+
+def _construir_estilo_original(tabelas: dict) -> int:
+    """Styler da tabela SOC com ``background_gradient``, como a página fazia antes."""
+    df = tabela_por_operacao(tabelas, "SOC")
+    colunas = [col for col in tabelas["colunas_pct"] if col in df.columns]
+    estilo = df.style.format(tabelas["format"]).background_gradient(cmap="Reds", axis=0, subset=colunas)
+    estilo.to_html()
+    return len(df) * len(colunas)
+
+
+def _construir_estilo(tabelas: dict) -> int:
+    """Styler da tabela SOC como na página; retorna o número de células estilizadas."""
+    df = tabela_por_operacao(tabelas, "SOC")
+    estilos = estilos_gradiente(df, tabelas["colunas_pct"])
+    estilo = df.style.format(tabelas["format"]).apply(lambda _: estilos, axis=None)
+    estilo.to_html()
+    return int((estilos != "").to_numpy().sum())
+
+
+def executar(linhas: int, repeticoes: int = REPETICOES) -> list[dict]:
+    """Mede todas as etapas para ``linhas`` viagens."""
+    bruto = gerar_viagens(linhas)
+    etapas = []
+
+    def registrar(nome, funcao, *args):
+        resultado, segundos, pico = medir(funcao, *args, repeticoes=repeticoes)
+        etapas.append({"linhas": linhas, "etapa": nome, "segundos": segundos, "pico_mb": pico})
+        return resultado
+
+    df = registrar("preparar_dados", preparar_dados, bruto)
+    cubo = registrar("criar_cubo", criar_cubo, df)
+    _, status_cols = registrar("criar_pivot_por_operacao", criar_pivot_por_operacao, cubo)
+    registrar(
+        "criar_tabela_detalhada_por_grupo",
+        criar_tabela_detalhada_por_grupo, cubo, status_cols, "regional", "Regional"
+    )
+    df_detalhado, _ = registrar("criar_tabela_detalhada", criar_tabela_detalhada, cubo, status_cols)
+    registrar("ordenar_colunas", ordenar_colunas, df_detalhado, ORDEM_COLUNAS)
+    tabelas = registrar("montar_tabelas", montar_tabelas, cubo)
+    registrar("estilos_background_gradient", _construir_estilo_original, tabelas)
+    registrar("estilos", _construir_estilo, tabelas)
+    return etapas
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def imprimir(resultados: list[dict], base: list[dict] | None = None):
+    """Tabela de resultados, com a variação em relação à ``base`` se houver."""
+    anteriores = {(r["linhas"], r["etapa"]): r for r in base or []}
+    cabecalho = f"{'linhas':>9} {'etapa':<34} {'tempo (s)':>10} {'pico (MB)':>10}"
+    if base:
+        cabecalho += f" {'Δ tempo':>9} {'Δ pico':>9}"
+    print(cabecalho)
+    for r in resultados:
+        linha = f"{r['linhas']:>9,} {r['etapa']:<34} {r['segundos']:>10.3f} {r['pico_mb']:>10.1f}"
+        anterior = anteriores.get((r["linhas"], r["etapa"]))
+        if anterior:
+            linha += (
+                f" {r['segundos'] / max(anterior['segundos'], 1e-9) - 1:>+9.0%}"
+                f" {r['pico_mb'] / max(anterior['pico_mb'], 1e-9) - 1:>+9.0%}"
+            )
+        print(linha)
+
+    tempos = {(r["linhas"], r["etapa"]): r["segundos"] for r in resultados}
+    for linhas in dict.fromkeys(r["linhas"] for r in resultados):
+        original = tempos.get((linhas, "estilos_background_gradient"))
+        if original and tempos.get((linhas, "estilos")):
+            print(
+                f"Estilos com {linhas:,} linhas: background_gradient {original:.3f}s, "
+                f"estilos_gradiente {tempos[(linhas, 'estilos')]:.3f}s "
+                f"({original / tempos[(linhas, 'estilos')]:.2f}x)"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, nargs="+", default=LINHAS_PADRAO)
+    parser.add_argument("--json", help="Salva os resultados neste arquivo")
+    parser.add_argument("--comparar", help="Resultados de referência (JSON) para comparar")
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES)
+    args = parser.parse_args()
+
+    # Aquecimento (imports tardios e caches do pandas) fora da medicao
+    executar(1_000, repeticoes=1)
+
+    resultados = []
+    for linhas in args.linhas:
+        resultados.extend(executar(linhas, args.repeticoes))
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)["resultados"]
+
+    print()
+    imprimir(resultados, base)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": _commit(),
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "resultados": resultados,
+            }, f, indent=2)
+        print(f"\nResultados salvos em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
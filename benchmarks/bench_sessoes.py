@@ -0,0 +1,95 @@
+"""
+Benchmark de memória por sessão do Resumo Geral.
+
+Abre várias sessões da página (``streamlit.testing``) sobre os mesmos dados
+sintéticos e mede, com tracemalloc, a memória retida por cada sessão
+adicional e o pico durante a execução. Os dados, o cubo e o índice são
+compartilhados entre as sessões; o custo de um novo visitante deve ser só o
+das tabelas exibidas.
+
+Execute a partir da raiz do repositório:
+    python -m benchmarks.bench_sessoes
+    python -m benchmarks.bench_sessoes --linhas 1000000 --sessoes 10
+"""
+import argparse
+import gc
+import os
+import tempfile
+import tracemalloc
+
+from streamlit.testing.v1 import AppTest
+
+import utils.data_loader as data_loader
+from benchmarks.dados_sinteticos import gerar_viagens
+from utils.atualizador import AtualizadorDados
+from utils.data_loader import memoria_mb
+
+PAGINA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pages", "1_Resumo_Geral.py")
+
+SESSOES = 5
+
+
+def _abrir_sessao() -> AppTest:
+    sessao = AppTest.from_file(PAGINA, default_timeout=300)
+    sessao.run()
+    if sessao.exception:
+        raise RuntimeError(sessao.exception[0].message)
+    return sessao
+
+
+def executar(linhas: int, sessoes: int = SESSOES) -> dict:
+    """Abre ``sessoes`` sessões sobre ``linhas`` viagens e mede cada uma."""
+    dados = gerar_viagens(linhas)
+    # Mesma versão para todas as sessões, sem planilha
+    atualizador = AtualizadorDados(lambda: dados, inicial=dados)
+    data_loader.obter_atualizador = lambda: atualizador
+    # Histórico vazio e descartável, nunca o ./historico de verdade
+    historico = tempfile.TemporaryDirectory()
+    data_loader.caminho_historico = lambda: historico.name
+
+    abertas = []
+    medidas = []
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for _ in range(sessoes):
+            antes, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            abertas.append(_abrir_sessao())
+            gc.collect()
+            depois, pico = tracemalloc.get_traced_memory()
+            medidas.append({"retida_mb": (depois - antes) / 1024 ** 2, "pico_mb": (pico - antes) / 1024 ** 2})
+    finally:
+        tracemalloc.stop()
+        atualizador.parar()
+        historico.cleanup()
+
+    adicionais = medidas[1:] or medidas
+    return {
+        "linhas": linhas,
+        "dados_mb": memoria_mb(dados),
+        "sessoes": medidas,
+        "por_sessao_adicional_mb": sum(m["retida_mb"] for m in adicionais) / len(adicionais),
+    }
+
+
+def imprimir(resultado: dict):
+    print(f"\n{resultado['linhas']:,} viagens ({resultado['dados_mb']:.1f} MB de dados)")
+    print(f"{'sessão':>7} {'retida (MB)':>12} {'pico (MB)':>10}")
+    for i, medida in enumerate(resultado["sessoes"], start=1):
+        print(f"{i:>7} {medida['retida_mb']:>12.2f} {medida['pico_mb']:>10.1f}")
+    print(f"Memória por sessão adicional: {resultado['por_sessao_adicional_mb']:.2f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--sessoes", type=int, default=SESSOES)
+    args = parser.parse_args()
+
+    for linhas in args.linhas:
+        imprimir(executar(linhas, args.sessoes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark das tabelas do Resumo Geral: Styler x column_config.
+
+Compara, para tabelas com N estações, o tempo de ``st.dataframe`` e o
+tamanho do elemento enviado ao navegador em três modos:
+
+- ``styler``: ``.format`` + ``.background_gradient`` (modo original)
+- ``styler_pre``: ``.format`` + CSS do gradiente pré-calculado
+- ``column_config``: DataFrame puro, formatação no navegador
+
+Cada modo roda em um script de ``streamlit.testing`` (API pública); o
+tamanho é o do elemento serializado, com o Arrow, o CSS e o column_config.
+
+Execute a partir da raiz do repositório:
+    python -m benchmarks.bench_tabelas
+    python -m benchmarks.bench_tabelas --linhas 20 200 1000 5000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+LINHAS_PADRAO = [20, 200, 1000]
+REPETICOES = 3
+
+
+def tabela_sintetica(linhas: int, semente: int = 0) -> pd.DataFrame:
+    """Tabela no formato do detalhamento por estação."""
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame({"Estação": [f"EST-{i:04d}" for i in range(linhas)]})
+    for col in ["Total", "Created", "Assigned", "Arrived", "Loading", "Departed",
+                "Seal", "fechada", "Cancelled", "No show"]:
+        df[col] = rng.integers(0, 5000, linhas)
+    for col in ["% No show", "%Cancel Nok", "% fechada", "% ETA", "% CPT"]:
+        df[col] = rng.uniform(0, 100, linhas)
+    for col in ["ETA Trips", "ETA Delay", "CPT Trips", "CPT Delay"]:
+        df[col] = rng.integers(0, 3000, linhas)
+    return df
+
+
+MODOS = ["styler", "styler_pre", "column_config"]
+
+
+def _pagina(modo, df):
+    """Script medido: um único ``st.dataframe`` no modo pedido (sem anotações: o código roda isolado)."""
+    import time
+
+    import streamlit as st
+
+    from utils.resumo_geral import criar_format_dict, estilos_gradiente
+
+    formatos = criar_format_dict(df)
+    colunas_pct = [col for col in df.columns if col.startswith("%")]
+
+    inicio = time.perf_counter()
+    if modo == "styler":
+        st.dataframe(
+            df.style.format(formatos).background_gradient(cmap="Reds", axis=0, subset=colunas_pct)
+        )
+    elif modo == "styler_pre":
+        estilos = estilos_gradiente(df, colunas_pct)
+        st.dataframe(df.style.format(formatos).apply(lambda _: estilos, axis=None))
+    else:
+        st.dataframe(df, column_config={
+            col: st.column_config.ProgressColumn(col, format="%.2f%%", min_value=0, max_value=100)
+            if col in colunas_pct else st.column_config.NumberColumn(col, format="%,d")
+            for col in df.columns if col != "Estação"
+        })
+    st.session_state["segundos"] = time.perf_counter() - inicio
+
+
+def medir_modo(modo: str, df: pd.DataFrame, repeticoes: int = REPETICOES) -> tuple[float, int]:
+    """Menor tempo de ``st.dataframe`` entre as repetições e bytes do elemento."""
+    tempos = []
+    for _ in range(repeticoes):
+        sessao = AppTest.from_function(_pagina, args=(modo, df), default_timeout=120)
+        sessao.run()
+        if sessao.exception:
+            raise RuntimeError(sessao.exception[0].message)
+        tempos.append(sessao.session_state["segundos"])
+    return min(tempos), sessao.dataframe[0].proto.ByteSize()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, nargs="+", default=LINHAS_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES)
+    args = parser.parse_args()
+
+    print(f"{'linhas':>7} {'modo':<14} {'tempo (ms)':>11} {'payload (KB)':>13}")
+    for n in args.linhas:
+        df = tabela_sintetica(n)
+        for modo in MODOS:
+            tempo, tamanho = medir_modo(modo, df, args.repeticoes)
+            print(f"{n:>7} {modo:<14} {tempo * 1000:>11.1f} {tamanho / 1024:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
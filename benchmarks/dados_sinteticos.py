@@ -0,0 +1,74 @@
+"""
+Gerador de viagens sintéticas no formato da aba ``db`` da planilha.
+
+As colunas e os tipos seguem o que ``carregar_dados_sheets`` entrega:
+textos para códigos, status e datas (``dd/mm/aaaa HH:MM:SS``, vazio se não
+realizado) e números já convertidos para contadores.
+"""
+import numpy as np
+import pandas as pd
+
+OPERACOES = ["SOC", "FMH", "XD", "LM"]
+
+REGIONAIS = ["SP", "RJ", "MG", "SUL", "NE", "CO", "NO"]
+
+STATUS = [
+    "Created", "Assigning", "Assigned", "Arrived", "Loading",
+    "Departed", "Seal", "fechada", "Cancelled", "No show",
+]
+PESOS_STATUS = [0.04, 0.02, 0.05, 0.05, 0.06, 0.10, 0.08, 0.50, 0.07, 0.03]
+
+STATUS_PRAZO = ["ON TIME", "DELAY", ""]
+PESOS_PRAZO = [0.7, 0.2, 0.1]
+
+# Datas distintas sorteadas (a planilha repete muito os mesmos horarios)
+DATAS_DISTINTAS = 2000
+
+
+def _datas(rng: np.random.Generator, linhas: int, realizadas: float) -> np.ndarray:
+    base = pd.Timestamp("2024-01-01")
+    minutos = rng.integers(0, 60 * 24 * 30, DATAS_DISTINTAS)
+    opcoes = (base + pd.to_timedelta(minutos, unit="min")).strftime("%d/%m/%Y %H:%M:%S")
+    datas = np.asarray(opcoes, dtype=object)[rng.integers(0, DATAS_DISTINTAS, linhas)]
+    return np.where(rng.random(linhas) < realizadas, datas, "")
+
+
+def gerar_viagens(linhas: int, estacoes: int = 80, semente: int = 0) -> pd.DataFrame:
+    """
+    Viagens sintéticas com o esquema da aba ``db``.
+
+    Args:
+        linhas: Número de viagens
+        estacoes: Número de estações (prefixo = operação, ex.: SOC-SP001)
+        semente: Semente do gerador aleatório
+
+    Returns:
+        DataFrame no formato bruto, pronto para ``preparar_dados``
+    """
+    rng = np.random.default_rng(semente)
+
+    codigos = np.array([
+        f"{OPERACOES[i % len(OPERACOES)]}-{REGIONAIS[i % len(REGIONAIS)]}{i:03d}"
+        for i in range(estacoes)
+    ])
+    # Cada estacao pertence a uma regional; algumas sem regional na planilha
+    regional_estacao = np.array([REGIONAIS[i % len(REGIONAIS)] for i in range(estacoes)], dtype=object)
+    regional_estacao[rng.random(estacoes) < 0.05] = ""
+
+    estacao = rng.integers(0, estacoes, linhas)
+    status = rng.choice(STATUS, linhas, p=PESOS_STATUS)
+    cancelada = status == "Cancelled"
+
+    return pd.DataFrame({
+        "trip_number": np.char.add("LT", np.arange(linhas).astype(str)),
+        "origin_station_code": codigos[estacao],
+        "regional": regional_estacao[estacao],
+        "status_agrupado": status,
+        "status_cpt": rng.choice(STATUS_PRAZO, linhas, p=PESOS_PRAZO),
+        "cpt_origin_realized": _datas(rng, linhas, 0.75),
+        "status_eta": rng.choice(STATUS_PRAZO, linhas, p=PESOS_PRAZO),
+        "eta_origin_realized": _datas(rng, linhas, 0.6),
+        "total_orders": rng.integers(0, 400, linhas),
+        "aderencia_cancelamento": np.where(cancelada, rng.integers(0, 2, linhas), 0),
+        "contagem_cancelamentos": cancelada.astype(int),
+    })
@@ -3,13 +3,47 @@ Captura screenshot do Dashboard de Performance e envia para SeaTalk
 Execute: python enviar_dashboard_seatalk.py
 
 IMPORTANTE: O dashboard deve estar acessivel pela URL configurada!
+
+Com RENDER_MODE=servidor as tabelas sao montadas direto da planilha e
+desenhadas com matplotlib, sem navegador nem dashboard no ar (exige as
+credenciais do app e as dependencias do requirements.txt).
 """
 
 import asyncio
 import os
 import base64
+import signal
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
 import requests
-from playwright.async_api import async_playwright
+
+from seatalk.aquecimento import aquecer
+from seatalk.agenda import criar_agenda, horarios_perdidos, trava_execucao
+from seatalk.caixa_saida import (
+    DIRETORIO_SAIDA,
+    IDADE_MAXIMA,
+    atualizar,
+    descartar,
+    guardar,
+    id_destino,
+    pendentes,
+    remover,
+)
+from seatalk.cliente_http import STATUS_REPETIVEIS, criar_sessao, requisitar
+from seatalk.imagem import preparar_imagens
+from seatalk.metricas import anexar_jsonl, cronometrar, gravar_prometheus, montar_registro
+from seatalk.impressao import (
+    ARQUIVO_IMPRESSOES,
+    carregar_impressoes,
+    hash_imagem,
+    impressao_dados,
+    salvar_impressoes,
+)
+from seatalk.navegador import RECICLAR_APOS, PoolNavegador
+from seatalk.prontidao import aguardar_dashboard_pronto, aguardar_quadro
+from seatalk.tarefas import carregar_tarefas
 
 # ============================================
 # CONFIGURACOES
@@ -24,12 +58,40 @@ STREAMLIT_URL = os.getenv(
 # URL do webhook do SeaTalk (obrigatorio via env/secrets)
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")
 
-# Tempo de espera para o dashboard carregar (segundos)
-WAIT_TIME = int(os.getenv("WAIT_TIME", "8"))
+# Tempo maximo de espera para o dashboard ficar pronto (segundos).
+# A captura acontece assim que o dashboard termina de renderizar.
+WAIT_TIME = int(os.getenv("WAIT_TIME", "60"))
 
-# Intervalo entre envios (segundos). Default: 1 hora
+# Intervalo entre envios (segundos), alinhado ao relogio. Default: 1 hora (hora cheia)
 SEND_INTERVAL = int(os.getenv("SEND_INTERVAL", "3600"))
 
+# Agenda cron (minuto hora dia mes dia-da-semana); substitui SEND_INTERVAL.
+# Ex.: "0 8-18 * * 1-5" = de hora em hora, das 8h as 18h, em dias uteis
+SCHEDULE_CRON = os.getenv("SCHEDULE_CRON", "")
+
+# Fuso da agenda (ex.: America/Sao_Paulo). Vazio = fuso local da maquina
+SCHEDULE_TZ = os.getenv("SCHEDULE_TZ", "")
+
+# Horarios perdidos durante uma execucao longa: coalesce (uma execucao
+# imediata para todos) ou skip (espera o proximo horario futuro)
+MISSED_SLOTS = os.getenv("MISSED_SLOTS", "coalesce").lower()
+
+# Executa um envio ao iniciar o modo continuo, antes do primeiro horario
+RUN_ON_START = os.getenv("RUN_ON_START", "true").lower() == "true"
+
+# Aquecimento: acorda o app no Streamlit Cloud e preenche o cache dos dados
+# antes da captura (modo navegador)
+WARMUP = os.getenv("WARMUP", "true").lower() == "true"
+# Limite do aquecimento, incluindo acordar o app (segundos)
+WARMUP_TIMEOUT = int(os.getenv("WARMUP_TIMEOUT", "180"))
+# Antecedencia do aquecimento em relacao ao horario agendado (modo continuo)
+WARMUP_LEAD = int(os.getenv("WARMUP_LEAD", "120"))
+# Apenas aquece e encerra (ex.: cron alguns minutos antes do envio)
+WARMUP_ONLY = os.getenv("WARMUP_ONLY", "false").lower() == "true"
+
+# Trava contra execucoes simultaneas (varios processos)
+LOCK_FILE = os.getenv("LOCK_FILE", ".seatalk.lock")
+
 # Se True, executa apenas uma vez e encerra
 RUN_ONCE = os.getenv("RUN_ONCE", "false").lower() == "true"
 
@@ -40,101 +102,195 @@ HEADLESS = os.getenv("HEADLESS", "true").lower() == "true"
 VIEWPORT_WIDTH = 3500
 VIEWPORT_HEIGHT = 2000
 
+# Compactacao da imagem antes do envio
+# Formato: png (paleta quantizada), jpeg ou webp
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "png").lower()
+# Largura final em pixels (0 = manter a do screenshot)
+IMAGE_WIDTH = int(os.getenv("IMAGE_WIDTH", str(VIEWPORT_WIDTH)))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+IMAGE_COLORS = int(os.getenv("IMAGE_COLORS", "256"))
+# Altura maxima de cada imagem; a pagina e dividida entre as tabelas (0 = nao divide)
+IMAGE_TILE_HEIGHT = int(os.getenv("IMAGE_TILE_HEIGHT", "0"))
+# Limite do conteudo base64 de cada imagem (bytes)
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(5 * 1024 * 1024)))
+
+# Pula o envio quando nada mudou desde o ultimo: imagem, dados ou off
+FINGERPRINT_MODE = os.getenv("FINGERPRINT_MODE", "imagem").lower()
+FINGERPRINT_FILE = os.getenv("FINGERPRINT_FILE", ARQUIVO_IMPRESSOES)
+
+# Envia mesmo sem alteracoes
+FORCE_SEND = os.getenv("FORCE_SEND", "false").lower() == "true"
+
+# Origem da imagem: navegador (screenshot do dashboard) ou servidor
+# (tabelas renderizadas direto dos dados, sem navegador)
+RENDER_MODE = os.getenv("RENDER_MODE", "navegador").lower()
+
+# O modo "dados" so vale quando a imagem sai dos mesmos dados (servidor): no
+# navegador o app pode estar servindo uma versao anterior a sincronizada aqui,
+# e a imagem antiga ficaria registrada com a impressao dos dados novos
+if FINGERPRINT_MODE == "dados" and RENDER_MODE != "servidor":
+    print("⚠️ FINGERPRINT_MODE=dados exige RENDER_MODE=servidor; usando imagem")
+    FINGERPRINT_MODE = "imagem"
+
+# Tentativas por requisicao HTTP e backoff exponencial (segundos)
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "4"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "2"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "60"))
+# Timeout de cada POST no webhook (segundos)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+
+# Envios que falharam ficam em disco e sao reenviados no proximo ciclo
+OUTBOX_DIR = os.getenv("OUTBOX_DIR", DIRETORIO_SAIDA)
+OUTBOX_MAX_AGE = int(os.getenv("OUTBOX_MAX_AGE", str(IDADE_MAXIMA)))
+
+# Maximo de capturas simultaneas (abas do mesmo navegador)
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "3"))
+
+# Capturas antes de reciclar o navegador no modo continuo
+BROWSER_RECYCLE_AFTER = int(os.getenv("BROWSER_RECYCLE_AFTER", str(RECICLAR_APOS)))
+
+
+# Metricas por rodada: historico em JSON lines e textfile do Prometheus
+# (vazio desativa)
+METRICS_FILE = os.getenv("METRICS_FILE", ".seatalk_metrics.jsonl")
+METRICS_PROM_FILE = os.getenv("METRICS_PROM_FILE", "")
+
+# Conexoes HTTP reutilizadas entre health checks e envios
+SESSION = criar_sessao()
+
 
 # ============================================
 # FUNCOES
 # ============================================
 
+def save_file(path: str, data: bytes):
+    """Grava a imagem em disco"""
+    with open(path, 'wb') as f:
+        f.write(data)
+    print(f"💾 Salvo: {path}")
+
+
+def criar_pool(headless: bool = True) -> PoolNavegador:
+    """Cria o pool de navegador com o viewport do dashboard"""
+    return PoolNavegador(
+        headless=headless,
+        viewport={'width': VIEWPORT_WIDTH, 'height': VIEWPORT_HEIGHT},
+        device_scale_factor=2,
+        reciclar_apos=BROWSER_RECYCLE_AFTER
+    )
+
+
 async def capture_single_page(
     streamlit_url: str,
-    wait_time: int = 8,
-    headless: bool = True
+    wait_time: int = 60,
+    headless: bool = True,
+    pool: PoolNavegador | None = None,
+    output_path: str = "dashboard_resumo_geral.png",
+    phases: dict | None = None
 ) -> bytes:
     """
     Captura screenshot da pagina do dashboard
 
     Args:
         streamlit_url: URL do dashboard Streamlit
-        wait_time: Tempo de espera para carregar (segundos)
+        wait_time: Tempo maximo de espera para carregar (segundos)
         headless: Se True, executa sem abrir janela
+        pool: Navegador ja iniciado para reutilizar. Se None, um navegador
+            temporario e aberto e fechado nesta captura
+        output_path: Caminho onde o screenshot e salvo
+        phases: Recebe a duracao de cada fase (browser, navigation,
+            readiness, screenshot), em segundos
 
     Returns:
         bytes: screenshot_bytes
     """
-    async with async_playwright() as p:
-        print("🌐 Iniciando navegador...")
+    pool_temporario = pool is None
+    if pool_temporario:
+        pool = criar_pool(headless)
 
-        browser = await p.chromium.launch(headless=headless)
-
-        # Viewport grande para capturar dashboard completo em uma tela
-        context = await browser.new_context(
-            viewport={'width': VIEWPORT_WIDTH, 'height': VIEWPORT_HEIGHT},
-            device_scale_factor=2
-        )
-        page = await context.new_page()
+    try:
+        # Inclui a (re)inicializacao do navegador quando necessaria
+        started = time.perf_counter()
+        async with pool.pagina() as page:
+            if phases is not None:
+                phases['browser'] = time.perf_counter() - started
 
-        try:
             print(f"📊 Acessando dashboard: {streamlit_url}")
-            await page.goto(streamlit_url, wait_until='networkidle', timeout=60000)
-
-            print(f"⏳ Aguardando {wait_time}s para dashboard carregar...")
-            await asyncio.sleep(wait_time)
+            with cronometrar(phases, 'navigation'):
+                await page.goto(streamlit_url, wait_until='domcontentloaded', timeout=60000)
 
-            # Aguarda elementos do Streamlit
-            try:
-                await page.wait_for_selector('[data-testid=\"stAppViewContainer\"]', timeout=10000)
-                print("✅ Dashboard carregado!")
-            except:
-                print("⚠️ Elementos do Streamlit nao detectados, continuando...")
+            print(f"⏳ Aguardando dashboard ficar pronto (ate {wait_time}s)...")
+            with cronometrar(phases, 'readiness'):
+                tempo_pronto = await aguardar_dashboard_pronto(page, tempo_maximo=wait_time)
+                if tempo_pronto is not None:
+                    print(f"✅ Dashboard carregado em {tempo_pronto:.1f}s!")
+                else:
+                    print("⚠️ Dashboard nao ficou pronto no tempo limite, continuando...")
 
-            # Scroll para o topo
-            await page.evaluate("window.scrollTo(0, 0)")
-            await asyncio.sleep(0.5)
+                # Scroll para o topo
+                await page.evaluate("window.scrollTo(0, 0)")
+                await aguardar_quadro(page)
 
             print("📸 Capturando screenshot da pagina...")
-            screenshot = await page.screenshot(
-                full_page=True,
-                type='png',
-                timeout=30000
-            )
+            with cronometrar(phases, 'screenshot'):
+                screenshot = await page.screenshot(
+                    full_page=True,
+                    type='png',
+                    timeout=30000
+                )
             print(f"✅ Screenshot capturado! Tamanho: {len(screenshot)} bytes")
 
-            # Salva screenshot
-            with open("dashboard_resumo_geral.png", 'wb') as f:
-                f.write(screenshot)
-            print("💾 Salvo: dashboard_resumo_geral.png")
-
-            return screenshot
-
-        finally:
-            await browser.close()
+    finally:
+        if pool_temporario:
             print()
-            print("🔒 Navegador fechado")
+            await pool.fechar()
 
+    # Salva fora da aba, sem bloquear o loop de eventos
+    await asyncio.to_thread(save_file, output_path, screenshot)
+    return screenshot
 
-def send_to_seatalk(image_data: bytes, webhook_url: str, description: str = "") -> dict:
+
+def render_job(job: dict, cube, output_path: str) -> bytes:
     """
-    Envia imagem para o SeaTalk
+    Renderiza as tabelas da tarefa sem navegador
 
     Args:
-        image_data: Dados binarios da imagem
-        webhook_url: URL do webhook do SeaTalk
-        description: Descricao para log
+        job: Tarefa de carregar_tarefas (usa os filtros)
+        cube: Cubo agregado carregado uma vez por rodada
+        output_path: Caminho onde a imagem e salva
 
     Returns:
-        dict: Resultado da operacao
+        bytes: imagem PNG
     """
+    from seatalk.renderizacao import renderizar_resumo
+
+    image = renderizar_resumo(cube, job.get('filtros'))
+    save_file(output_path, image)
+    return image
+
+
+def build_payload(image_data: bytes) -> dict:
+    """Monta o payload de imagem do webhook do SeaTalk"""
     # Codifica em base64
     image_base64 = base64.b64encode(image_data).decode('utf-8')
 
-    # Prepara payload
-    payload = {
+    return {
         "tag": "image",
         "image_base64": {
             "content": image_base64
         }
     }
 
+
+def post_payload(payload: dict, webhook_url: str, description: str = "") -> dict:
+    """
+    Envia um payload ja montado para o webhook, repetindo falhas transitorias
+
+    Returns:
+        dict: Resultado da operacao. 'retryable' indica falha transitoria
+        sem entrega (erro de conexao, 429 ou 5xx), que pode ser reenviada
+        no proximo ciclo
+    """
     headers = {
         'Content-Type': 'application/json'
     }
@@ -142,11 +298,16 @@ def send_to_seatalk(image_data: bytes, webhook_url: str, description: str = "")
     print(f"📤 Enviando {description}...")
 
     try:
-        response = requests.post(
+        response = requisitar(
+            SESSION,
+            "POST",
             webhook_url,
+            tentativas=HTTP_RETRIES,
+            espera_base=HTTP_BACKOFF,
+            espera_maxima=HTTP_BACKOFF_MAX,
             headers=headers,
             json=payload,
-            timeout=60
+            timeout=HTTP_TIMEOUT
         )
 
         response.raise_for_status()
@@ -157,6 +318,7 @@ def send_to_seatalk(image_data: bytes, webhook_url: str, description: str = "")
             print(f"📨 Message ID: {result.get('message_id', 'N/A')}")
             return {
                 'success': True,
+                'status': response.status_code,
                 'message_id': result.get('message_id'),
                 'response': result
             }
@@ -164,115 +326,653 @@ def send_to_seatalk(image_data: bytes, webhook_url: str, description: str = "")
             print(f"⚠️ Resposta: {result}")
             return {
                 'success': False,
+                'status': response.status_code,
                 'error': f"Resposta inesperada: {result}",
-                'response': result
+                'response': result,
+                'retryable': False
             }
 
     except requests.exceptions.RequestException as e:
         error_msg = str(e)
         print(f"❌ Erro ao enviar: {error_msg}")
+        status = e.response.status_code if e.response is not None else None
+        if status is not None:
+            retryable = status in STATUS_REPETIVEIS
+        else:
+            # So erro de conexao garante que nada chegou ao SeaTalk; timeout
+            # de leitura (entrega incerta), resposta 200 sem JSON e URL
+            # invalida nao sao reenviados
+            retryable = isinstance(e, requests.exceptions.ConnectionError)
         return {
             'success': False,
-            'error': error_msg
+            'status': status,
+            'error': error_msg,
+            'retryable': retryable
         }
 
 
-async def run_once():
-    """Executa uma rodada de captura e envio"""
-    print("=" * 70)
-    print("🚀 Dashboard Performance 3PL → SeaTalk (Resumo Geral)")
-    print("=" * 70)
-    print(f"📊 Dashboard URL: {STREAMLIT_URL}")
-    print(f"⏱️  Tempo de espera: {WAIT_TIME}s")
-    print(f"⏲️  Intervalo de envio: {SEND_INTERVAL}s")
-    print(f"🧩 Modo uma vez: {RUN_ONCE}")
-    print(f"👁️  Headless: {HEADLESS}")
-    print(f"📐 Viewport: {VIEWPORT_WIDTH}x{VIEWPORT_HEIGHT}")
-    print("=" * 70)
-    print()
+def send_to_seatalk(
+    images: list[bytes],
+    webhook_url: str,
+    description: str = "",
+    job_name: str | None = None,
+    fingerprint: dict | None = None
+) -> dict:
+    """
+    Envia as imagens (blocos) de uma tela para o SeaTalk, em ordem
 
-    if not WEBHOOK_URL:
-        print("❌ WEBHOOK_URL nao configurado. Defina a variavel de ambiente.")
-        return
+    Para no primeiro bloco que falhar. Se a falha for transitoria, os
+    blocos ainda nao entregues vao juntos, como uma unidade, para a caixa
+    de saida e sao reenviados no proximo ciclo; um envio bem-sucedido
+    descarta pendentes antigos da mesma tarefa para o mesmo webhook.
+
+    Args:
+        images: Dados binarios de cada imagem
+        webhook_url: URL do webhook do SeaTalk
+        description: Descricao para log
+        job_name: Tarefa do envio (substitui pendentes anteriores)
+        fingerprint: Impressao do conteudo, registrada quando o pendente
+            for entregue
+
+    Returns:
+        dict: Resultado do ultimo envio, com 'images' (blocos entregues)
+    """
+    envios = [
+        {
+            'descricao': description if len(images) == 1 else f"{description} ({i}/{len(images)})",
+            'payload': build_payload(image)
+        }
+        for i, image in enumerate(images, start=1)
+    ]
+    delivered = 0
+    for envio in envios:
+        result = post_payload(envio['payload'], webhook_url, envio['descricao'])
+        if not result.get('success'):
+            break
+        delivered += 1
+    result['images'] = delivered
+
+    if result.get('success'):
+        if job_name is not None:
+            descartar(job_name, webhook_url, OUTBOX_DIR)
+    elif result.get('retryable'):
+        guardar(webhook_url, envios[delivered:], description, OUTBOX_DIR, job_name, fingerprint)
+    return result
+
+
+def flush_outbox(webhooks: list[str]) -> list[dict]:
+    """
+    Reenvia os envios pendentes de ciclos anteriores, em ordem
 
-    # Verifica se o Streamlit esta acessivel
+    Cada pendente e a sequencia de blocos de uma tela; se um bloco falhar,
+    so os que faltam continuam na caixa.
+
+    Args:
+        webhooks: Webhooks configurados; pendentes de outros destinos
+            permanecem na caixa ate vencerem
+
+    Returns:
+        list[dict]: Pendentes entregues por completo (com 'tarefa' e
+        'impressao', para registrar o envio da tarefa)
+    """
+    destinations = {id_destino(webhook): webhook for webhook in webhooks}
+    items = [
+        (path, item) for path, item in pendentes(OUTBOX_DIR, OUTBOX_MAX_AGE)
+        if item.get('destino') in destinations
+    ]
+    if not items:
+        return []
+
+    print(f"📬 Reenviando {len(items)} envio(s) pendente(s)...")
+    delivered = []
+    blocked = set()
+    for path, item in items:
+        webhook = destinations[item['destino']]
+        # Mantem a ordem por webhook: se um falhar, os seguintes esperam
+        if webhook in blocked:
+            continue
+        envios = item['envios']
+        sent = 0
+        for envio in envios:
+            result = post_payload(envio['payload'], webhook, f"{envio['descricao']} (pendente)")
+            if not result.get('success'):
+                break
+            sent += 1
+
+        if sent == len(envios):
+            remover(path)
+            delivered.append(item)
+            continue
+        blocked.add(webhook)
+        if result.get('retryable'):
+            if sent:
+                atualizar(path, {**item, 'envios': envios[sent:]})
+        else:
+            remover(path)
+    print(f"📬 Pendentes reenviados: {len(delivered)}/{len(items)}")
+    return delivered
+
+
+def record_delivered(delivered: list[dict]):
+    """
+    Registra como enviadas as telas entregues pela caixa de saida
+
+    Sem isso o ciclo seguinte compararia com a impressao antiga e enviaria
+    o mesmo conteudo de novo. Tarefas que ainda tem pendentes ficam como
+    estao.
+    """
+    waiting = {item.get('tarefa') for _, item in pendentes(OUTBOX_DIR, OUTBOX_MAX_AGE)}
+    fingerprints = carregar_impressoes(FINGERPRINT_FILE)
+    changed = False
+    for item in delivered:
+        job_name = item.get('tarefa')
+        if job_name and item.get('impressao') and job_name not in waiting:
+            fingerprints[job_name] = item['impressao']
+            changed = True
+    if changed:
+        salvar_impressoes(fingerprints, FINGERPRINT_FILE)
+
+
+def check_dashboard(url: str) -> bool:
+    """Verifica se o Streamlit esta acessivel"""
     try:
-        response = requests.get(STREAMLIT_URL, timeout=10)
+        response = requisitar(
+            SESSION,
+            "GET",
+            url,
+            tentativas=HTTP_RETRIES,
+            espera_base=HTTP_BACKOFF,
+            espera_maxima=HTTP_BACKOFF_MAX,
+            timeout=10
+        )
         if response.status_code == 200:
-            print("✅ Dashboard Streamlit esta acessivel!")
-        else:
-            print(f"⚠️ Dashboard retornou status {response.status_code}")
-            return
+            print(f"✅ Dashboard Streamlit esta acessivel: {url}")
+            return True
+        print(f"⚠️ Dashboard retornou status {response.status_code}: {url}")
+        return False
     except requests.exceptions.RequestException as e:
-        print(f"❌ ERRO: Dashboard nao esta acessivel em {STREAMLIT_URL}")
+        print(f"❌ ERRO: Dashboard nao esta acessivel em {url}")
         print(f"   Erro: {str(e)}")
         print()
         print("   💡 Verifique se a URL esta correta e acessivel")
         print()
-        return
+        return False
+
+
+async def warm_up(pool: PoolNavegador, jobs: list[dict]):
+    """
+    Acorda e aquece cada dashboard (sem query params) antes das capturas
 
+    Args:
+        pool: Navegador compartilhado
+        jobs: Tarefas da rodada
+    """
+    urls = sorted({job['url'].split('?')[0] for job in jobs})
+    print(f"🔥 Aquecendo {len(urls)} dashboard(s) (ate {WARMUP_TIMEOUT}s)...")
+    results = await asyncio.gather(
+        *(aquecer(pool, url, WARMUP_TIMEOUT) for url in urls),
+        return_exceptions=True
+    )
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ Falha ao aquecer {url}: {str(result)}")
+            continue
+        initial = result['estado_inicial'] or "sem resposta"
+        woke = ", acordado" if result['acordado'] else ""
+        if result['pronto']:
+            print(f"🔥 {url}: pronto em {result['segundos']:.1f}s (estado inicial: {initial}{woke})")
+        else:
+            print(f"⚠️ {url}: nao ficou pronto em {WARMUP_TIMEOUT}s (estado inicial: {initial}{woke})")
     print()
 
-    # Captura screenshot da pagina
+
+async def run_warmup(pool: PoolNavegador | None = None):
+    """Aquece os dashboards das tarefas configuradas, sem capturar nem enviar"""
+    jobs = [job for job in carregar_tarefas(STREAMLIT_URL, WEBHOOK_URL) if job['webhooks']]
+    if not jobs:
+        return
+
+    temporary_pool = pool is None
+    if temporary_pool:
+        pool = criar_pool(HEADLESS)
     try:
-        screenshot = await capture_single_page(
-            streamlit_url=STREAMLIT_URL,
-            wait_time=WAIT_TIME,
-            headless=HEADLESS
+        await warm_up(pool, jobs)
+    except Exception as e:
+        print(f"⚠️ Erro no aquecimento: {str(e)}")
+    finally:
+        if temporary_pool:
+            await pool.fechar()
+
+
+async def run_job(
+    job: dict,
+    pool: PoolNavegador,
+    semaphore: asyncio.Semaphore,
+    fingerprints: dict,
+    data_fingerprint: str | None = None,
+    cube=None,
+    stop: asyncio.Event | None = None
+) -> dict:
+    """
+    Captura o dashboard de uma tarefa e envia para todos os seus webhooks
+
+    Args:
+        job: Tarefa de carregar_tarefas (nome, url, webhooks, arquivo)
+        pool: Navegador compartilhado entre as tarefas
+        semaphore: Limita quantas abas capturam ao mesmo tempo
+        fingerprints: Impressoes do ultimo envio por tarefa (atualizado em caso de sucesso)
+        data_fingerprint: Impressao dos dados atuais (modo "dados")
+        cube: Cubo agregado (RENDER_MODE=servidor)
+        stop: Sinal de encerramento; tarefas ainda nao capturadas sao puladas
+
+    Returns:
+        dict: Resumo da tarefa, com a duracao das fases, os bytes e cada
+        envio (status HTTP e message_id) para as metricas
+    """
+    summary = {
+        'name': job['nome'],
+        'file': job['arquivo'],
+        'captured': False,
+        'sent': 0,
+        'targets': len(job['webhooks']),
+        'skipped': None,
+        'errors': [],
+        'phases': {},
+        'bytes': {},
+        'uploads': []
+    }
+    phases = summary['phases']
+    previous = fingerprints.get(job['nome'], {})
+
+    if data_fingerprint and not FORCE_SEND and previous.get('dados') == data_fingerprint:
+        print(f"⏭️ {job['nome']}: dados sem alteracao, captura e envio pulados")
+        summary['skipped'] = "dados sem alteracao"
+        return summary
+
+    def stopping() -> bool:
+        if stop is None or not stop.is_set():
+            return False
+        print(f"⏭️ {job['nome']}: encerramento solicitado, captura pulada")
+        summary['skipped'] = "encerramento solicitado"
+        return True
+
+    try:
+        if cube is not None:
+            if stopping():
+                return summary
+            with cronometrar(phases, 'render'):
+                screenshot = await asyncio.to_thread(render_job, job, cube, job['arquivo'])
+        else:
+            async with semaphore:
+                # Tarefas na fila do semaforo nao comecam apos o sinal
+                if stopping():
+                    return summary
+                screenshot = await capture_single_page(
+                    streamlit_url=job['url'],
+                    wait_time=WAIT_TIME,
+                    headless=HEADLESS,
+                    pool=pool,
+                    output_path=job['arquivo'],
+                    phases=phases
+                )
+    except Exception as e:
+        print(f"❌ Erro ao capturar {job['nome']}: {str(e)}")
+        summary['errors'].append(f"captura: {e}")
+        return summary
+
+    summary['captured'] = True
+    summary['bytes']['captured'] = len(screenshot)
+    image_fingerprint = None
+    if FINGERPRINT_MODE == "imagem":
+        image_fingerprint = await asyncio.to_thread(hash_imagem, screenshot)
+        if not FORCE_SEND and previous.get('imagem') == image_fingerprint:
+            print(f"⏭️ {job['nome']}: imagem sem alteracao, envio pulado")
+            summary['skipped'] = "imagem sem alteracao"
+            return summary
+
+    with cronometrar(phases, 'encode'):
+        images = await asyncio.to_thread(
+            preparar_imagens,
+            screenshot,
+            formato=IMAGE_FORMAT,
+            largura=IMAGE_WIDTH,
+            qualidade=IMAGE_QUALITY,
+            cores=IMAGE_COLORS,
+            altura_bloco=IMAGE_TILE_HEIGHT,
+            tamanho_maximo=IMAGE_MAX_BYTES
         )
+    summary['bytes']['sent'] = sum(len(image) for image in images)
+
+    fingerprint = {'dados': data_fingerprint, 'imagem': image_fingerprint}
+
+    def send_images(webhook: str) -> dict:
+        started = time.perf_counter()
+        # Blocos vao em ordem para o mesmo grupo
+        result = send_to_seatalk(images, webhook, job['nome'], job['nome'], fingerprint)
+        summary['uploads'].append({
+            'destination': id_destino(webhook),
+            'success': bool(result.get('success')),
+            'status': result.get('status'),
+            'message_id': result.get('message_id'),
+            'images': result['images'],
+            'seconds': round(time.perf_counter() - started, 3)
+        })
+        return result
+
+    with cronometrar(phases, 'upload'):
+        results = await asyncio.gather(*(
+            asyncio.to_thread(send_images, webhook)
+            for webhook in job['webhooks']
+        ))
+    for result in results:
+        if result.get('success'):
+            summary['sent'] += 1
+        else:
+            summary['errors'].append(result.get('error'))
 
-        if screenshot:
-            print()
-            print("=" * 70)
-            print("📤 ENVIANDO PARA SEATALK")
-            print("=" * 70)
+    if summary['sent'] == summary['targets']:
+        fingerprints[job['nome']] = fingerprint
+    return summary
 
-            result = send_to_seatalk(
-                image_data=screenshot,
-                webhook_url=WEBHOOK_URL,
-                description="Resumo Geral"
-            )
 
-            # Resumo final
-            print()
-            print("=" * 70)
-            print("📊 RESUMO DO ENVIO")
-            print("=" * 70)
+def write_metrics(record: dict):
+    """Grava o registro da rodada (JSON lines e textfile do Prometheus)"""
+    try:
+        if METRICS_FILE:
+            anexar_jsonl(record, METRICS_FILE)
+        if METRICS_PROM_FILE:
+            gravar_prometheus(record, METRICS_PROM_FILE)
+    except OSError as e:
+        print(f"⚠️ Nao foi possivel gravar as metricas: {str(e)}")
+        return
+    if METRICS_FILE or METRICS_PROM_FILE:
+        print(f"📈 Metricas da rodada: {', '.join(f for f in (METRICS_FILE, METRICS_PROM_FILE) if f)}")
 
-            success_count = 1 if result.get('success') else 0
 
-            print(f"✅ Enviados com sucesso: {success_count}/1")
-            print()
-            print("📸 Screenshot salvo:")
-            print("   - dashboard_resumo_geral.png")
+def print_summary(summaries: list[dict]):
+    """Imprime o resumo por tarefa"""
+    print()
+    print("=" * 70)
+    print("📊 RESUMO DO ENVIO")
+    print("=" * 70)
 
-            if success_count == 1:
-                print()
-                print("🎉 Tela enviada com sucesso!")
-            else:
-                print()
-                print("❌ Nenhuma tela foi enviada. Verifique o webhook.")
+    for summary in summaries:
+        if summary['skipped']:
+            print(f"⏭️ {summary['name']}: {summary['skipped']}")
+            continue
+        status = "✅" if summary['captured'] and summary['sent'] == summary['targets'] else "❌"
+        capture = f"📸 {summary['file']}" if summary['captured'] else "📸 sem captura"
+        print(f"{status} {summary['name']}: {summary['sent']}/{summary['targets']} enviados | {capture}")
+        for erro in summary['errors']:
+            print(f"   - {erro}")
+
+    total_sent = sum(s['sent'] for s in summaries)
+    total_targets = sum(s['targets'] for s in summaries if not s['skipped'])
+    print()
+    print(f"✅ Enviados com sucesso: {total_sent}/{total_targets}")
+    if not total_targets:
+        print("⏭️ Nenhuma alteracao desde o ultimo envio.")
+    elif total_sent == total_targets:
+        print("🎉 Todas as telas enviadas com sucesso!")
+    elif total_sent == 0:
+        print("❌ Nenhuma tela foi enviada. Verifique os webhooks.")
+    print("=" * 70)
+
+
+async def run_once(
+    pool: PoolNavegador | None = None,
+    stop: asyncio.Event | None = None,
+    warm: bool = True
+):
+    """
+    Executa uma rodada de captura e envio de todas as tarefas
+
+    As tarefas rodam em paralelo: a captura de uma tarefa sobrepoe o envio
+    das anteriores. Chamadas bloqueantes (HTTP, disco, imagem) rodam em
+    threads para o loop de eventos continuar respondendo. Ao final, o
+    registro da rodada vai para METRICS_FILE / METRICS_PROM_FILE.
+
+    Args:
+        pool: Navegador reutilizado entre rodadas (modo continuo)
+        stop: Sinal de encerramento (envios em andamento terminam)
+        warm: Aquece os dashboards antes de capturar (WARMUP); falso quando
+            o aquecimento ja foi feito antes do horario
+    """
+    jobs = carregar_tarefas(STREAMLIT_URL, WEBHOOK_URL)
+
+    print("=" * 70)
+    print("🚀 Dashboard Performance 3PL → SeaTalk")
+    print("=" * 70)
+    for job in jobs:
+        print(f"📊 {job['nome']}: {job['url']} → {len(job['webhooks'])} webhook(s)")
+    print(f"⏱️  Tempo maximo de espera: {WAIT_TIME}s")
+    print(f"⏲️  Agenda: {SCHEDULE_CRON or f'a cada {SEND_INTERVAL}s'}")
+    print(f"🧩 Modo uma vez: {RUN_ONCE}")
+    print(f"🖼️  Renderizacao: {RENDER_MODE}")
+    if RENDER_MODE != "servidor":
+        print(f"👁️  Headless: {HEADLESS}")
+        print(f"📐 Viewport: {VIEWPORT_WIDTH}x{VIEWPORT_HEIGHT}")
+    print(f"🗜️  Imagem: {IMAGE_FORMAT}, largura {IMAGE_WIDTH or 'original'}, limite {IMAGE_MAX_BYTES:,} bytes")
+    print(f"🔀 Capturas simultaneas: {MAX_CONCURRENCY}")
+    print(f"🔁 Impressao digital: {FINGERPRINT_MODE}{' (envio forcado)' if FORCE_SEND else ''}")
+    print("=" * 70)
+    print()
+
+    jobs = [job for job in jobs if job['webhooks']]
+    if not jobs:
+        print("❌ WEBHOOK_URL nao configurado. Defina a variavel de ambiente.")
+        return
+
+    started = time.time()
+    run_phases = {}
+    summaries = []
+    context = {'mode': RENDER_MODE}
+    if RENDER_MODE != "servidor":
+        context.update(wait_time=WAIT_TIME, viewport=f"{VIEWPORT_WIDTH}x{VIEWPORT_HEIGHT}")
 
-            print("=" * 70)
+    try:
+        # Pendentes de ciclos anteriores saem antes dos novos envios
+        webhooks = [webhook for job in jobs for webhook in job['webhooks']]
+        with cronometrar(run_phases, 'outbox'):
+            delivered = await asyncio.to_thread(flush_outbox, webhooks)
+            if delivered:
+                await asyncio.to_thread(record_delivered, delivered)
+        context['outbox_sent'] = len(delivered)
+        if delivered:
+            print()
+
+        cube = None
+        if RENDER_MODE == "servidor":
+            # Dados lidos uma vez e compartilhados entre as tarefas
+            from seatalk.renderizacao import carregar_cubo
+            try:
+                with cronometrar(run_phases, 'load_data'):
+                    cube = await asyncio.to_thread(carregar_cubo)
+            except Exception as e:
+                print(f"❌ Erro ao carregar os dados: {str(e)}")
+                return
         else:
-            print("❌ Nao foi possivel capturar o screenshot")
+            # Verifica cada dashboard uma vez (sem query params), em paralelo
+            urls = sorted({job['url'].split('?')[0] for job in jobs})
+            with cronometrar(run_phases, 'health_check'):
+                results = await asyncio.gather(*(asyncio.to_thread(check_dashboard, url) for url in urls))
+            accessible = dict(zip(urls, results))
+            context['dashboards'] = len(urls)
+            context['dashboards_up'] = sum(results)
+            jobs = [job for job in jobs if accessible[job['url'].split('?')[0]]]
+            if not jobs:
+                return
 
-    except Exception as e:
-        print(f"❌ Erro durante execucao: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        print()
+
+        fingerprints = await asyncio.to_thread(carregar_impressoes, FINGERPRINT_FILE)
+        data_fingerprint = None
+        if FINGERPRINT_MODE == "dados":
+            try:
+                data_fingerprint = await asyncio.to_thread(impressao_dados, cube)
+            except Exception as e:
+                print(f"⚠️ Nao foi possivel calcular a impressao dos dados: {str(e)}")
+
+        temporary_pool = pool is None
+        if temporary_pool:
+            pool = criar_pool(HEADLESS)
+
+        try:
+            if warm and WARMUP and cube is None:
+                with cronometrar(run_phases, 'warmup'):
+                    await warm_up(pool, jobs)
+
+            semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+            summaries.extend(await asyncio.gather(*(
+                run_job(job, pool, semaphore, fingerprints, data_fingerprint, cube, stop)
+                for job in jobs
+            )))
+            await asyncio.to_thread(salvar_impressoes, fingerprints, FINGERPRINT_FILE)
+            print_summary(summaries)
+
+        except Exception as e:
+            print(f"❌ Erro durante execucao: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
+        finally:
+            if temporary_pool:
+                await pool.fechar()
+
+    finally:
+        # Registrada tambem quando a rodada para no health check
+        record = montar_registro(started, run_phases, summaries, **context)
+        await asyncio.to_thread(write_metrics, record)
+
+
+def install_shutdown_handlers(stop: asyncio.Event):
+    """
+    SIGINT/SIGTERM encerram o agendador de forma ordenada
+
+    O primeiro sinal deixa os envios em andamento terminarem e impede novos
+    ciclos; o segundo cancela imediatamente.
+    """
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+
+    def handle(sig: signal.Signals):
+        if stop.is_set():
+            print(f"🛑 {sig.name} recebido novamente, cancelando...")
+            main_task.cancel()
+            return
+        print(f"🛑 {sig.name} recebido, encerrando apos os envios em andamento...")
+        stop.set()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, handle, sig)
+        except (NotImplementedError, RuntimeError):
+            # Windows: mantem o comportamento padrao (KeyboardInterrupt)
+            pass
+
+
+async def run_guarded(
+    pool: PoolNavegador | None = None,
+    stop: asyncio.Event | None = None,
+    warm: bool = True
+) -> bool:
+    """
+    Executa uma rodada se nenhuma outra estiver em andamento
+
+    Returns:
+        bool: False se a rodada foi pulada por sobreposicao
+    """
+    with trava_execucao(LOCK_FILE) as acquired:
+        if not acquired:
+            print(f"⏭️ Outra execucao em andamento ({LOCK_FILE}), rodada pulada")
+            return False
+        await run_once(pool, stop, warm)
+        return True
+
+
+def print_run_metrics(slot: datetime | None, lateness: float, duration: float, ran: bool, missed: list):
+    """Imprime atraso e duracao de uma rodada agendada"""
+    label = f"{slot:%Y-%m-%d %H:%M:%S}" if slot else "inicial"
+    status = "executada" if ran else "pulada (sobreposicao)"
+    line = f"⏰ Horario {label}: {status} | atraso {lateness:.1f}s | duracao {duration:.1f}s"
+    if missed:
+        line += f" | {len(missed)} horario(s) perdido(s) ({MISSED_SLOTS})"
+    print(line)
 
 
 async def run_scheduler():
-    """Executa o envio em loop no intervalo configurado"""
-    while True:
-        await run_once()
-        if RUN_ONCE:
-            break
-        print()
-        print(f"🕒 Aguardando {SEND_INTERVAL}s para o proximo envio...")
-        await asyncio.sleep(SEND_INTERVAL)
+    """Executa o envio nos horarios da agenda, sem acumular atraso"""
+    stop = asyncio.Event()
+    install_shutdown_handlers(stop)
+
+    if WARMUP_ONLY:
+        await run_warmup()
+        return
+
+    if RUN_ONCE:
+        await run_guarded(stop=stop)
+        return
+
+    timezone = ZoneInfo(SCHEDULE_TZ) if SCHEDULE_TZ else None
+
+    def now() -> datetime:
+        return datetime.now(timezone).astimezone(timezone)
+
+    async def wait_until(moment: datetime) -> bool:
+        """Espera ate o horario; True se o encerramento foi solicitado"""
+        delay = (moment - now()).total_seconds()
+        if delay <= 0:
+            return stop.is_set()
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=delay)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    schedule = criar_agenda(SCHEDULE_CRON, SEND_INTERVAL, timezone)
+    print(f"📅 Agenda: {schedule}")
+
+    # Modo continuo: navegador iniciado uma vez e reutilizado a cada ciclo
+    pool = criar_pool(HEADLESS)
+    try:
+        slot = now() if RUN_ON_START else schedule.proximo(now())
+        first = RUN_ON_START
+        while not stop.is_set():
+            delay = (slot - now()).total_seconds()
+            if delay > 0:
+                print()
+                print(f"🕒 Proximo envio em {slot:%Y-%m-%d %H:%M:%S %Z} ({delay:.0f}s)...")
+
+            # Aquece antes do horario para a captura encontrar o app quente
+            warmed = False
+            if WARMUP and RENDER_MODE != "servidor" and delay > WARMUP_LEAD:
+                if await wait_until(slot - timedelta(seconds=WARMUP_LEAD)):
+                    break
+                await run_warmup(pool)
+                warmed = True
+
+            if await wait_until(slot):
+                break
+
+            started = time.monotonic()
+            lateness = max(0.0, (now() - slot).total_seconds())
+            ran = await run_guarded(pool, stop, warm=not warmed)
+            duration = time.monotonic() - started
+
+            finished = now()
+            missed = horarios_perdidos(schedule, slot, finished) if not first else []
+            print_run_metrics(None if first else slot, lateness, duration, ran, missed)
+            first = False
+
+            if missed and MISSED_SLOTS == "coalesce":
+                # Todos os horarios perdidos viram uma unica execucao imediata
+                slot = missed[-1]
+            else:
+                slot = schedule.proximo(finished)
+        print("👋 Agendador encerrado")
+    finally:
+        await pool.fechar()
 
 
 if __name__ == "__main__":
-    asyncio.run(run_scheduler())
\ No newline at end of file
+    asyncio.run(run_scheduler())
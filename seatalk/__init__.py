@@ -0,0 +1 @@
+"""Componentes do envio do dashboard para o SeaTalk."""
@@ -0,0 +1,171 @@
+"""
+Agenda dos envios alinhada ao relógio.
+
+Os horários vêm de uma expressão cron de 5 campos (minuto hora dia mês
+dia-da-semana, ex.: ``0 8-18 * * 1-5`` = de hora em hora em horário
+comercial) ou de um intervalo fixo alinhado à meia-noite (3600 = sempre na
+hora cheia). Como o próximo horário é calculado a partir do relógio, e não
+somando o intervalo ao fim da execução anterior, a agenda não acumula
+atraso.
+
+Também oferece uma trava de arquivo para impedir duas execuções
+simultâneas (ex.: cron do CI e execução manual).
+"""
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta, tzinfo
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Limite da busca pelo proximo horario (expressoes impossiveis, ex.: 30/02)
+HORIZONTE_BUSCA = timedelta(days=366 * 4)
+
+NOMES_DIAS = {"sun": 0, "mon": 1, "tue": 2, "wed": 3, "thu": 4, "fri": 5, "sat": 6}
+NOMES_MESES = {
+    nome: i for i, nome in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"],
+        start=1
+    )
+}
+
+
+def _valor(texto: str, nomes: dict) -> int:
+    return nomes[texto.lower()] if texto.lower() in nomes else int(texto)
+
+
+def _campo(texto: str, minimo: int, maximo: int, nomes: dict | None = None) -> frozenset:
+    """Valores aceitos por um campo cron (``*``, listas, intervalos e passos)."""
+    nomes = nomes or {}
+    valores = set()
+    for parte in texto.split(","):
+        faixa, _, passo = parte.partition("/")
+        if faixa == "*":
+            inicio, fim = minimo, maximo
+        elif "-" in faixa:
+            a, b = faixa.split("-", 1)
+            inicio, fim = _valor(a, nomes), _valor(b, nomes)
+        else:
+            inicio = _valor(faixa, nomes)
+            fim = maximo if passo else inicio
+        if not (minimo <= inicio <= maximo and minimo <= fim <= maximo) or inicio > fim:
+            raise ValueError(f"Campo cron fora do intervalo {minimo}-{maximo}: {parte}")
+        valores.update(range(inicio, fim + 1, int(passo) if passo else 1))
+    return frozenset(valores)
+
+
+class AgendaCron:
+    """Horários de uma expressão cron de 5 campos."""
+
+    def __init__(self, expressao: str, fuso: tzinfo | None = None):
+        campos = expressao.split()
+        if len(campos) != 5:
+            raise ValueError(f"Expressao cron deve ter 5 campos: {expressao!r}")
+        self.expressao = expressao
+        self.fuso = fuso
+        self.minutos = _campo(campos[0], 0, 59)
+        self.horas = _campo(campos[1], 0, 23)
+        self.dias = _campo(campos[2], 1, 31)
+        self.meses = _campo(campos[3], 1, 12, NOMES_MESES)
+        # 7 tambem é domingo
+        dias_semana = _campo(campos[4], 0, 7, NOMES_DIAS)
+        self.dias_semana = frozenset(d % 7 for d in dias_semana)
+        # Como no cron: com dia e dia da semana restritos, vale qualquer um
+        self._dia_livre = campos[2] == "*"
+        self._semana_livre = campos[4] == "*"
+
+    def __str__(self) -> str:
+        return f"cron '{self.expressao}'"
+
+    def _dia_aceito(self, data: datetime) -> bool:
+        no_mes = data.day in self.dias
+        na_semana = (data.weekday() + 1) % 7 in self.dias_semana
+        if self._dia_livre or self._semana_livre:
+            return no_mes and na_semana
+        return no_mes or na_semana
+
+    def proximo(self, apos: datetime) -> datetime:
+        """Primeiro horário estritamente depois de ``apos``."""
+        local = apos.astimezone(self.fuso) if self.fuso else apos
+        candidato = local.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = candidato + HORIZONTE_BUSCA
+        while candidato < limite:
+            if candidato.month not in self.meses or not self._dia_aceito(candidato):
+                candidato = (candidato + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidato.hour not in self.horas:
+                candidato = (candidato + timedelta(hours=1)).replace(minute=0)
+            elif candidato.minute not in self.minutos:
+                candidato += timedelta(minutes=1)
+            else:
+                return candidato
+        raise ValueError(f"Nenhum horario encontrado para {self}")
+
+
+class AgendaIntervalo:
+    """Horários a cada ``segundos``, contados a partir da meia-noite local."""
+
+    def __init__(self, segundos: int, fuso: tzinfo | None = None):
+        if segundos <= 0:
+            raise ValueError("Intervalo deve ser positivo")
+        self.segundos = segundos
+        self.fuso = fuso
+
+    def __str__(self) -> str:
+        return f"a cada {self.segundos}s (alinhado ao relogio)"
+
+    def proximo(self, apos: datetime) -> datetime:
+        """Primeiro horário estritamente depois de ``apos``."""
+        local = apos.astimezone(self.fuso) if self.fuso else apos
+        meia_noite = local.replace(hour=0, minute=0, second=0, microsecond=0)
+        decorrido = (local - meia_noite).total_seconds()
+        candidato = meia_noite + timedelta(seconds=(decorrido // self.segundos + 1) * self.segundos)
+        # O ultimo intervalo do dia termina na meia-noite seguinte
+        amanha = meia_noite + timedelta(days=1)
+        return min(candidato, amanha)
+
+
+def criar_agenda(cron: str | None, intervalo: int, fuso: tzinfo | None = None):
+    """Agenda cron se ``cron`` for informado; senão por intervalo."""
+    if cron:
+        return AgendaCron(cron, fuso)
+    return AgendaIntervalo(intervalo, fuso)
+
+
+def horarios_perdidos(agenda, horario: datetime, agora: datetime) -> list[datetime]:
+    """Horários posteriores a ``horario`` que já passaram até ``agora``."""
+    perdidos = []
+    proximo = agenda.proximo(horario)
+    while proximo <= agora:
+        perdidos.append(proximo)
+        proximo = agenda.proximo(proximo)
+    return perdidos
+
+
+@contextmanager
+def trava_execucao(caminho: str):
+    """
+    Trava exclusiva de arquivo entre processos.
+
+    Produz True se a trava foi obtida, False se outra execução está em
+    andamento. Sem ``fcntl`` (Windows) a trava é sempre concedida.
+    """
+    if fcntl is None:
+        yield True
+        return
+
+    with open(caminho, "a+") as arquivo:
+        try:
+            fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            arquivo.seek(0)
+            arquivo.truncate()
+            arquivo.write(str(os.getpid()))
+            arquivo.flush()
+            yield True
+        finally:
+            fcntl.flock(arquivo, fcntl.LOCK_UN)
@@ -0,0 +1,100 @@
+"""
+Aquecimento do app no Streamlit Cloud antes da captura.
+
+Apps sem acesso recente "dormem": a URL continua respondendo 200, mas com a
+página de "gone to sleep" (ou "in the oven" enquanto acorda) no lugar do
+dashboard. O aquecimento abre o dashboard, reconhece essas páginas, clica
+no botão para acordar o app e espera o dashboard renderizar por completo,
+o que também executa o script e preenche o cache dos dados da planilha.
+Assim a captura no horário agendado encontra o app e o cache quentes.
+"""
+import asyncio
+import re
+import time
+
+from playwright.async_api import Error as PlaywrightError
+
+from .prontidao import INTERVALO_VERIFICACAO_MS, aguardar_dashboard_pronto
+
+# Textos da pagina de app dormindo / acordando do Streamlit Cloud
+_SINAIS_DORMINDO = re.compile(r"gone to sleep|get this app back up|zzzz", re.IGNORECASE)
+_SINAIS_ACORDANDO = re.compile(r"in the oven|waking up|is starting up|please wait", re.IGNORECASE)
+_BOTAO_ACORDAR = re.compile(r"get this app back up|wake", re.IGNORECASE)
+
+_SCRIPT_ESTADO = """
+() => {
+    if (!document.body) return "";
+    if (document.querySelector('[data-testid="stAppViewContainer"]')) return "app";
+    return document.body.innerText.slice(0, 2000);
+}
+"""
+
+
+async def estado_pagina(page) -> str:
+    """
+    Estado atual do dashboard: "app", "dormindo", "acordando" ou "carregando".
+
+    Verifica todos os frames (no Streamlit Cloud o app roda em um iframe).
+    """
+    estado = "carregando"
+    for frame in page.frames:
+        try:
+            texto = await frame.evaluate(_SCRIPT_ESTADO)
+        except PlaywrightError:
+            continue
+        if texto == "app":
+            return "app"
+        if _SINAIS_DORMINDO.search(texto):
+            estado = "dormindo"
+        elif _SINAIS_ACORDANDO.search(texto) and estado != "dormindo":
+            estado = "acordando"
+    return estado
+
+
+async def acordar(page) -> bool:
+    """Clica no botão de acordar o app. Retorna True se encontrou o botão."""
+    for frame in page.frames:
+        botao = frame.get_by_role("button", name=_BOTAO_ACORDAR)
+        try:
+            if await botao.count():
+                await botao.first.click(timeout=5000)
+                return True
+        except PlaywrightError:
+            continue
+    return False
+
+
+async def aquecer(pool, url: str, tempo_maximo: float) -> dict:
+    """
+    Acorda o app (se necessário) e espera o dashboard ficar pronto.
+
+    Args:
+        pool: PoolNavegador usado para abrir a aba
+        url: URL do dashboard
+        tempo_maximo: Limite total do aquecimento (segundos)
+
+    Returns:
+        Dict com url, estado_inicial, acordado (clicou no botão), pronto e
+        segundos
+    """
+    inicio = time.perf_counter()
+    resultado = {"url": url, "estado_inicial": None, "acordado": False, "pronto": False}
+
+    async with pool.pagina() as page:
+        await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+
+        while time.perf_counter() - inicio < tempo_maximo:
+            estado = await estado_pagina(page)
+            if resultado["estado_inicial"] is None and estado != "carregando":
+                resultado["estado_inicial"] = estado
+            if estado == "app":
+                restante = tempo_maximo - (time.perf_counter() - inicio)
+                resultado["pronto"] = await aguardar_dashboard_pronto(page, restante) is not None
+                break
+            if estado == "dormindo" and not resultado["acordado"]:
+                print(f"😴 App dormindo, acordando: {url}")
+                resultado["acordado"] = await acordar(page)
+            await asyncio.sleep(INTERVALO_VERIFICACAO_MS / 1000)
+
+    resultado["segundos"] = time.perf_counter() - inicio
+    return resultado
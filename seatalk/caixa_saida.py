@@ -0,0 +1,140 @@
+"""
+Caixa de saída em disco para envios que falharam.
+
+Cada envio que não chegou ao SeaTalk por falha transitória é gravado como
+um arquivo JSON e reenviado no início do próximo ciclo, na ordem em que
+falhou. Um item é uma unidade: a sequência de imagens (blocos) ainda não
+entregue de uma tarefa para um webhook, com a impressão do conteúdo, para
+que o reenvio não repita blocos já entregues e o ciclo seguinte saiba que
+o conteúdo chegou. Um novo envio da mesma tarefa para o mesmo webhook
+substitui o item anterior. Itens mais antigos que ``idade_maxima`` são
+descartados (um relatório de horas atrás já foi substituído pelos
+seguintes).
+
+A URL do webhook não vai para o disco (o diretório pode ser salvo em
+cache no CI): o item guarda só um hash, resolvido com os webhooks
+configurados no momento do reenvio.
+"""
+import hashlib
+import json
+import os
+import time
+import uuid
+
+# Diretorio com os envios pendentes
+DIRETORIO_SAIDA = ".seatalk_outbox"
+
+# Idade maxima de um envio pendente (segundos)
+IDADE_MAXIMA = 6 * 3600
+
+
+def id_destino(webhook: str) -> str:
+    """Identificador do webhook gravado no lugar da URL."""
+    return hashlib.sha256(webhook.encode()).hexdigest()[:16]
+
+
+def _gravar(caminho: str, item: dict):
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(item, f)
+    os.replace(temporario, caminho)
+
+
+def guardar(
+    webhook: str,
+    envios: list[dict],
+    descricao: str,
+    diretorio: str = DIRETORIO_SAIDA,
+    tarefa: str | None = None,
+    impressao: dict | None = None
+) -> str:
+    """
+    Grava o envio pendente de forma atomica e retorna o caminho.
+
+    Args:
+        webhook: Destino (gravado apenas como hash)
+        envios: Blocos ainda não entregues, em ordem, cada um com
+            ``descricao`` e ``payload``
+        descricao: Descrição do item para log
+        tarefa: Nome da tarefa; itens anteriores da mesma tarefa para o
+            mesmo webhook são descartados
+        impressao: Impressão do conteúdo (registrada após a entrega)
+    """
+    if tarefa is not None:
+        descartar(tarefa, webhook, diretorio)
+    os.makedirs(diretorio, exist_ok=True)
+    criado = time.time()
+    caminho = os.path.join(diretorio, f"{criado:.6f}_{uuid.uuid4().hex[:8]}.json")
+    _gravar(caminho, {
+        "destino": id_destino(webhook),
+        "descricao": descricao,
+        "tarefa": tarefa,
+        "impressao": impressao,
+        "criado": criado,
+        "envios": envios,
+    })
+    print(f"📥 {descricao} guardada para reenvio ({len(envios)} imagem(ns)): {caminho}")
+    return caminho
+
+
+def atualizar(caminho: str, item: dict):
+    """Regrava um item pendente (ex.: só com os blocos que faltam)."""
+    _gravar(caminho, item)
+
+
+def pendentes(
+    diretorio: str = DIRETORIO_SAIDA,
+    idade_maxima: float = IDADE_MAXIMA
+) -> list[tuple[str, dict]]:
+    """
+    Envios pendentes, do mais antigo para o mais novo.
+
+    Arquivos ilegíveis ou vencidos são removidos.
+    """
+    if not os.path.isdir(diretorio):
+        return []
+
+    itens = []
+    agora = time.time()
+    for nome in sorted(os.listdir(diretorio)):
+        if not nome.endswith(".json"):
+            continue
+        caminho = os.path.join(diretorio, nome)
+        try:
+            with open(caminho, encoding="utf-8") as f:
+                item = json.load(f)
+        except (OSError, ValueError):
+            remover(caminho)
+            continue
+        if idade_maxima and agora - item.get("criado", 0) > idade_maxima:
+            print(f"🗑️ Envio pendente vencido descartado: {item.get('descricao')}")
+            remover(caminho)
+            continue
+        itens.append((caminho, item))
+    return itens
+
+
+def remover(caminho: str):
+    """Remove um envio pendente."""
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+
+def descartar(tarefa: str, webhook: str, diretorio: str = DIRETORIO_SAIDA) -> int:
+    """
+    Remove os pendentes de uma tarefa para um webhook (conteúdo superado).
+
+    Returns:
+        Quantidade removida
+    """
+    destino = id_destino(webhook)
+    removidos = 0
+    for caminho, item in pendentes(diretorio, idade_maxima=0):
+        if item.get("tarefa") == tarefa and item.get("destino") == destino:
+            remover(caminho)
+            removidos += 1
+    if removidos:
+        print(f"🗑️ {removidos} envio(s) pendente(s) de {tarefa} substituido(s)")
+    return removidos
@@ -0,0 +1,142 @@
+"""
+Cliente HTTP compartilhado (health check e webhooks do SeaTalk).
+
+Uma única ``requests.Session`` mantém as conexões abertas (keep-alive) entre
+requisições. Falhas transitórias (erro de conexão, timeout, 429 e 5xx) são
+repetidas com backoff exponencial e jitter, respeitando ``Retry-After``.
+Cada tentativa registra status e tempo.
+
+Requisições não idempotentes (POST de webhook) só são repetidas quando é
+certo que não chegaram ao servidor (erro de conexão) ou que ele as recusou
+(429/5xx): após um timeout de leitura a entrega é incerta e repetir
+poderia duplicar a mensagem.
+"""
+import random
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status que indicam falha transitória
+STATUS_REPETIVEIS = frozenset({408, 429, 500, 502, 503, 504})
+
+# Métodos que podem ser repetidos após qualquer timeout
+METODOS_IDEMPOTENTES = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+TENTATIVAS = 4
+ESPERA_BASE = 2.0
+ESPERA_MAXIMA = 60.0
+
+# Conexões mantidas por host (uma por envio simultâneo)
+CONEXOES_POR_HOST = 10
+
+
+def criar_sessao(conexoes: int = CONEXOES_POR_HOST) -> requests.Session:
+    """Sessão com pool de conexões reutilizadas entre requisições."""
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=conexoes, pool_maxsize=conexoes)
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    return sessao
+
+
+def ler_retry_after(valor: str | None) -> float | None:
+    """Segundos indicados em ``Retry-After`` (número ou data HTTP)."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, data.timestamp() - time.time())
+
+
+def calcular_espera(
+    tentativa: int,
+    espera_base: float = ESPERA_BASE,
+    espera_maxima: float = ESPERA_MAXIMA,
+    retry_after: float | None = None
+) -> float:
+    """
+    Espera antes da próxima tentativa.
+
+    Usa ``Retry-After`` quando o servidor informa; senão backoff exponencial
+    com jitter completo (entre 0 e ``espera_base * 2**tentativa``).
+    """
+    if retry_after is not None:
+        return min(retry_after, espera_maxima)
+    return random.uniform(0, min(espera_maxima, espera_base * 2 ** tentativa))
+
+
+def requisitar(
+    sessao: requests.Session,
+    metodo: str,
+    url: str,
+    tentativas: int = TENTATIVAS,
+    espera_base: float = ESPERA_BASE,
+    espera_maxima: float = ESPERA_MAXIMA,
+    idempotente: bool | None = None,
+    **kwargs
+) -> requests.Response:
+    """
+    Executa a requisição repetindo falhas transitórias.
+
+    Args:
+        sessao: Sessão de ``criar_sessao``
+        metodo: "GET", "POST", ...
+        url: Endereço da requisição
+        tentativas: Número máximo de tentativas
+        espera_base: Base do backoff exponencial (segundos)
+        espera_maxima: Limite de cada espera (segundos)
+        idempotente: Se a requisição pode ser repetida após um timeout de
+            leitura (padrão: pelo método). Senão só erros de conexão
+            (inclusive ``ConnectTimeout``) e status repetíveis são repetidos
+        **kwargs: Repassados para ``Session.request`` (json, timeout, ...)
+
+    Returns:
+        Resposta da última tentativa (o chamador verifica o status)
+
+    Raises:
+        requests.exceptions.RequestException: Se a última tentativa falhar
+            sem resposta
+    """
+    host = urlsplit(url).netloc
+    if idempotente is None:
+        idempotente = metodo.upper() in METODOS_IDEMPOTENTES
+    repetiveis = (
+        (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+        if idempotente else requests.exceptions.ConnectionError
+    )
+    for tentativa in range(tentativas):
+        inicio = time.perf_counter()
+        retry_after = None
+        try:
+            resposta = sessao.request(metodo, url, **kwargs)
+        except repetiveis as e:
+            duracao = time.perf_counter() - inicio
+            print(
+                f"🌐 {metodo} {host} tentativa {tentativa + 1}/{tentativas}: "
+                f"{type(e).__name__} em {duracao:.2f}s"
+            )
+            if tentativa + 1 == tentativas:
+                raise
+        else:
+            duracao = time.perf_counter() - inicio
+            print(
+                f"🌐 {metodo} {host} tentativa {tentativa + 1}/{tentativas}: "
+                f"{resposta.status_code} em {duracao:.2f}s"
+            )
+            if resposta.status_code not in STATUS_REPETIVEIS or tentativa + 1 == tentativas:
+                return resposta
+            retry_after = ler_retry_after(resposta.headers.get("Retry-After"))
+            resposta.close()
+
+        espera = calcular_espera(tentativa, espera_base, espera_maxima, retry_after)
+        print(f"🔁 Nova tentativa em {espera:.1f}s")
+        time.sleep(espera)
@@ -0,0 +1,163 @@
+"""
+Compactação do screenshot antes do envio em base64 para o SeaTalk.
+
+Etapas: redimensionar para a largura alvo, dividir a página em blocos
+cortando em faixas vazias (entre as tabelas), codificar (PNG quantizado,
+JPEG ou WebP) e reduzir qualidade/escala até o payload caber no limite.
+Cada etapa registra tempo e bytes.
+"""
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+FORMATOS = ("png", "jpeg", "webp")
+
+# Amplitude maxima de cinza para uma linha ser considerada vazia
+TOLERANCIA_LINHA_VAZIA = 8
+
+# Qualidade minima antes de passar a reduzir a escala (JPEG/WebP)
+QUALIDADE_MINIMA = 40
+
+
+def tamanho_base64(num_bytes: int) -> int:
+    """Tamanho do conteudo depois de codificado em base64."""
+    return 4 * ((num_bytes + 2) // 3)
+
+
+def _registrar(etapa: str, inicio: float, detalhe: str):
+    print(f"🗜️  {etapa}: {detalhe} em {time.perf_counter() - inicio:.2f}s")
+
+
+def redimensionar(img: Image.Image, largura: int) -> Image.Image:
+    """Reduz a imagem para ``largura`` mantendo a proporcao (nunca amplia)."""
+    if not largura or img.width <= largura:
+        return img
+    altura = round(img.height * largura / img.width)
+    return img.resize((largura, altura), Image.Resampling.LANCZOS)
+
+
+def pontos_de_corte(img: Image.Image, altura_maxima: int) -> list[int]:
+    """
+    Coordenadas y onde a imagem deve ser cortada.
+
+    Cada bloco tem no maximo ``altura_maxima`` pixels. O corte é feito na
+    ultima linha vazia (cor uniforme) da segunda metade do bloco, que no
+    dashboard corresponde ao espaço entre tabelas; sem linha vazia, o corte
+    é feito na altura maxima.
+    """
+    if not altura_maxima or img.height <= altura_maxima:
+        return []
+
+    cinza = np.asarray(img.convert("L"))
+    vazias = (cinza.max(axis=1) - cinza.min(axis=1)) <= TOLERANCIA_LINHA_VAZIA
+
+    cortes = []
+    inicio = 0
+    while img.height - inicio > altura_maxima:
+        janela = vazias[inicio + altura_maxima // 2:inicio + altura_maxima]
+        candidatas = np.flatnonzero(janela)
+        if candidatas.size:
+            corte = inicio + altura_maxima // 2 + int(candidatas[-1])
+        else:
+            corte = inicio + altura_maxima
+        cortes.append(corte)
+        inicio = corte
+    return cortes
+
+
+def dividir_em_blocos(img: Image.Image, altura_maxima: int) -> list[Image.Image]:
+    """Divide a imagem nos pontos de corte."""
+    limites = [0] + pontos_de_corte(img, altura_maxima) + [img.height]
+    return [img.crop((0, topo, img.width, base)) for topo, base in zip(limites, limites[1:])]
+
+
+def codificar(img: Image.Image, formato: str, qualidade: int = 85, cores: int = 256) -> bytes:
+    """Codifica a imagem no formato escolhido."""
+    buffer = io.BytesIO()
+    if formato == "png":
+        img.convert("RGB").quantize(colors=cores, method=Image.Quantize.FASTOCTREE).save(
+            buffer, format="PNG"
+        )
+    elif formato == "jpeg":
+        img.convert("RGB").save(buffer, format="JPEG", quality=qualidade, optimize=True, progressive=True)
+    elif formato == "webp":
+        img.save(buffer, format="WEBP", quality=qualidade, method=4)
+    else:
+        raise ValueError(f"Formato de imagem nao suportado: {formato}")
+    return buffer.getvalue()
+
+
+def _ajustar_ao_limite(
+    img: Image.Image,
+    formato: str,
+    qualidade: int,
+    cores: int,
+    tamanho_maximo: int
+) -> bytes:
+    """Codifica reduzindo qualidade e depois escala até caber no limite."""
+    for _ in range(10):
+        inicio = time.perf_counter()
+        dados = codificar(img, formato, qualidade, cores)
+        _registrar(
+            f"codificar {formato}",
+            inicio,
+            f"{img.width}x{img.height} q={qualidade} → {len(dados):,} bytes "
+            f"({tamanho_base64(len(dados)):,} em base64)"
+        )
+        if not tamanho_maximo or tamanho_base64(len(dados)) <= tamanho_maximo:
+            return dados
+        if formato != "png" and qualidade > QUALIDADE_MINIMA:
+            qualidade = max(QUALIDADE_MINIMA, qualidade - 15)
+        else:
+            img = redimensionar(img, int(img.width * 0.8))
+    print(f"⚠️ Imagem ainda excede {tamanho_maximo:,} bytes em base64")
+    return dados
+
+
+def preparar_imagens(
+    screenshot: bytes,
+    formato: str = "png",
+    largura: int = 0,
+    qualidade: int = 85,
+    cores: int = 256,
+    altura_bloco: int = 0,
+    tamanho_maximo: int = 0
+) -> list[bytes]:
+    """
+    Converte o screenshot PNG nas imagens que serao enviadas.
+
+    Args:
+        screenshot: PNG capturado pelo navegador
+        formato: "png" (quantizado), "jpeg" ou "webp"
+        largura: Largura alvo em pixels (0 mantem a original)
+        qualidade: Qualidade inicial de JPEG/WebP
+        cores: Cores da paleta do PNG quantizado
+        altura_bloco: Altura maxima de cada bloco (0 nao divide)
+        tamanho_maximo: Limite do payload base64 por imagem (0 sem limite)
+
+    Returns:
+        list[bytes]: Imagens codificadas, na ordem de cima para baixo
+    """
+    inicio = time.perf_counter()
+    img = Image.open(io.BytesIO(screenshot))
+    img.load()
+    _registrar("decodificar", inicio, f"{img.width}x{img.height}, {len(screenshot):,} bytes")
+
+    inicio = time.perf_counter()
+    largura_original = img.width
+    img = redimensionar(img, largura)
+    _registrar("redimensionar", inicio, f"{largura_original} → {img.width}px")
+
+    inicio = time.perf_counter()
+    blocos = dividir_em_blocos(img, altura_bloco)
+    _registrar("dividir", inicio, f"{len(blocos)} bloco(s)")
+
+    imagens = [
+        _ajustar_ao_limite(bloco, formato, qualidade, cores, tamanho_maximo)
+        for bloco in blocos
+    ]
+    total = sum(len(dados) for dados in imagens)
+    print(f"🗜️  Total: {len(screenshot):,} → {total:,} bytes em {len(imagens)} imagem(ns)")
+    return imagens
@@ -0,0 +1,81 @@
+"""
+Impressões digitais do conteúdo enviado, para pular envios repetidos.
+
+Dois modos:
+- ``imagem``: hash do conteúdo visual do screenshot; pula o upload (a
+  captura ainda acontece).
+- ``dados``: hash das agregações do Resumo Geral calculado direto da
+  planilha; pula também a captura. Exige as credenciais do app
+  (``.streamlit/secrets.toml`` ou ``credentials.json``) e
+  ``RENDER_MODE=servidor``: só assim a imagem enviada sai dos mesmos dados
+  da impressão (o app no navegador pode estar uma versão atrás).
+
+A última impressão enviada de cada tarefa fica em um arquivo JSON.
+"""
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+# Arquivo com a ultima impressao enviada por tarefa
+ARQUIVO_IMPRESSOES = ".seatalk_fingerprints.json"
+
+# Largura da imagem normalizada antes do hash
+LARGURA_NORMALIZADA = 1000
+
+# Niveis de cinza mantidos (absorve ruido de antialiasing)
+NIVEIS_CINZA = 32
+
+
+def hash_imagem(imagem: bytes, largura: int = LARGURA_NORMALIZADA) -> str:
+    """
+    Hash do conteudo visual da imagem.
+
+    A imagem é reduzida, convertida para cinza e quantizada antes do hash,
+    para tolerar ruido de renderizacao; qualquer numero alterado nas
+    tabelas ainda muda o resultado. Na duvida o hash muda e o envio ocorre.
+    """
+    img = Image.open(io.BytesIO(imagem)).convert("L")
+    if img.width > largura:
+        img = img.resize((largura, round(img.height * largura / img.width)), Image.Resampling.BOX)
+    pixels = np.asarray(img, dtype=np.uint8) // (256 // NIVEIS_CINZA)
+    conteudo = hashlib.sha256(f"{img.width}x{img.height}".encode())
+    conteudo.update(pixels.tobytes())
+    return conteudo.hexdigest()
+
+
+def impressao_dados(cubo=None) -> str:
+    """
+    Hash das tabelas agregadas do Resumo Geral.
+
+    Importado sob demanda: depende de pandas, gspread e streamlit. Sem
+    ``cubo``, os dados são lidos da fonte configurada.
+    """
+    from utils.agregacoes import impressao_digital
+    from utils.data_loader import fonte_configurada
+
+    if cubo is None:
+        cubo = fonte_configurada(sincronizar=True).criar_cubo()
+    return impressao_digital(cubo)
+
+
+def carregar_impressoes(caminho: str = ARQUIVO_IMPRESSOES) -> dict:
+    """Impressoes do ultimo envio de cada tarefa."""
+    if not os.path.exists(caminho):
+        return {}
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def salvar_impressoes(impressoes: dict, caminho: str = ARQUIVO_IMPRESSOES):
+    """Grava as impressoes de forma atomica."""
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(impressoes, f, indent=2, sort_keys=True)
+    os.replace(temporario, caminho)
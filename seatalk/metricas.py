@@ -0,0 +1,162 @@
+"""
+Métricas estruturadas de cada rodada de envio.
+
+Cada tarefa acumula a duração das fases (health check, navegador,
+navegação, espera de prontidão, screenshot, codificação, envio), os bytes
+capturados e enviados e o status HTTP / message_id de cada envio. Ao fim da
+rodada o registro é anexado a um arquivo JSON lines (histórico entre
+execuções) e, opcionalmente, gravado no formato textfile do Prometheus
+(node_exporter textfile collector).
+
+Webhooks nunca aparecem nas métricas: os destinos são identificados por
+``id_destino``.
+"""
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Linhas mantidas no historico JSON (cerca de 3 meses de rodadas por hora)
+MAXIMO_LINHAS = 2000
+
+PREFIXO = "seatalk"
+
+
+@contextmanager
+def cronometrar(fases: dict | None, nome: str):
+    """Soma a duração do bloco em ``fases[nome]`` (segundos)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if fases is not None:
+            fases[nome] = fases.get(nome, 0.0) + time.perf_counter() - inicio
+
+
+def montar_registro(inicio: float, fases: dict, tarefas: list[dict], **contexto) -> dict:
+    """
+    Registro da rodada.
+
+    Args:
+        inicio: ``time.time()`` do início da rodada
+        fases: Fases da rodada fora das tarefas (ex.: health_check)
+        tarefas: Resumos das tarefas (com phases, bytes e uploads)
+        contexto: Configuração relevante (modo, WAIT_TIME, viewport...)
+    """
+    return {
+        "timestamp": datetime.fromtimestamp(inicio, timezone.utc).isoformat(timespec="seconds"),
+        "run_id": os.getenv("GITHUB_RUN_ID"),
+        **contexto,
+        "duration": round(time.time() - inicio, 3),
+        "phases": {nome: round(segundos, 3) for nome, segundos in fases.items()},
+        "jobs": [
+            {
+                "name": tarefa["name"],
+                "captured": tarefa["captured"],
+                "skipped": tarefa["skipped"],
+                "sent": tarefa["sent"],
+                "targets": tarefa["targets"],
+                "errors": len(tarefa["errors"]),
+                "phases": {nome: round(s, 3) for nome, s in tarefa.get("phases", {}).items()},
+                "bytes": tarefa.get("bytes", {}),
+                "uploads": tarefa.get("uploads", []),
+            }
+            for tarefa in tarefas
+        ],
+    }
+
+
+def _modo_arquivo() -> int:
+    """Permissões de um arquivo novo comum (0666 menos a umask)."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# Lido uma vez: trocar a umask não é seguro com outras threads ativas
+MODO_ARQUIVO = _modo_arquivo()
+
+
+def _gravar_atomico(caminho: str, conteudo: str):
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(diretorio, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix=".metricas-")
+    try:
+        # mkstemp cria com 0600; o coletor do Prometheus costuma ser outro usuário
+        os.fchmod(descritor, MODO_ARQUIVO)
+        with os.fdopen(descritor, "w", encoding="utf-8") as f:
+            f.write(conteudo)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+def anexar_jsonl(registro: dict, caminho: str, maximo_linhas: int = MAXIMO_LINHAS):
+    """Anexa o registro ao histórico, mantendo as ``maximo_linhas`` mais recentes."""
+    linhas = []
+    if os.path.exists(caminho):
+        with open(caminho, encoding="utf-8") as f:
+            linhas = f.read().splitlines()
+    linhas.append(json.dumps(registro, ensure_ascii=False, default=str))
+    _gravar_atomico(caminho, "\n".join(linhas[-maximo_linhas:]) + "\n")
+
+
+def _rotulos(**rotulos) -> str:
+    def escapar(valor) -> str:
+        return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    if not rotulos:
+        return ""
+    return "{" + ",".join(f'{chave}="{escapar(valor)}"' for chave, valor in rotulos.items()) + "}"
+
+
+def formatar_prometheus(registro: dict) -> str:
+    """Registro da rodada no formato de exposição do Prometheus (gauges)."""
+    metricas = {
+        "run_timestamp_seconds": ("Início da última rodada (unix)", []),
+        "run_duration_seconds": ("Duração da última rodada", []),
+        "phase_duration_seconds": ("Duração de cada fase na última rodada", []),
+        "job_success": ("1 se a tarefa foi enviada a todos os destinos (ou pulada sem alteração)", []),
+        "image_bytes": ("Bytes da imagem capturada e enviada", []),
+        "upload_http_status": ("Status HTTP do último envio por destino", []),
+        "upload_duration_seconds": ("Duração do envio por destino", []),
+    }
+
+    def adicionar(nome: str, valor, **rotulos):
+        if valor is not None:
+            metricas[nome][1].append(f"{PREFIXO}_{nome}{_rotulos(**rotulos)} {valor}")
+
+    inicio = datetime.fromisoformat(registro["timestamp"]).timestamp()
+    adicionar("run_timestamp_seconds", int(inicio))
+    adicionar("run_duration_seconds", registro["duration"])
+    for fase, segundos in registro["phases"].items():
+        adicionar("phase_duration_seconds", segundos, job="", phase=fase)
+
+    for tarefa in registro["jobs"]:
+        nome = tarefa["name"]
+        for fase, segundos in tarefa["phases"].items():
+            adicionar("phase_duration_seconds", segundos, job=nome, phase=fase)
+        ok = tarefa["skipped"] is not None or (tarefa["captured"] and tarefa["sent"] == tarefa["targets"])
+        adicionar("job_success", int(ok), job=nome)
+        for tipo, quantidade in tarefa["bytes"].items():
+            adicionar("image_bytes", quantidade, job=nome, kind=tipo)
+        for envio in tarefa["uploads"]:
+            adicionar("upload_http_status", envio.get("status") or 0, job=nome, destination=envio["destination"])
+            adicionar("upload_duration_seconds", envio.get("seconds"), job=nome, destination=envio["destination"])
+
+    linhas = []
+    for nome, (descricao, amostras) in metricas.items():
+        if not amostras:
+            continue
+        linhas.append(f"# HELP {PREFIXO}_{nome} {descricao}")
+        linhas.append(f"# TYPE {PREFIXO}_{nome} gauge")
+        linhas.extend(amostras)
+    return "\n".join(linhas) + "\n"
+
+
+def gravar_prometheus(registro: dict, caminho: str):
+    """Grava o textfile de forma atômica (o coletor nunca lê um arquivo pela metade)."""
+    _gravar_atomico(caminho, formatar_prometheus(registro))
@@ -0,0 +1,112 @@
+"""
+Pool de navegador reutilizado entre capturas.
+
+O Chromium e o contexto (viewport) são iniciados uma única vez; cada
+captura abre apenas uma aba nova, e várias abas podem capturar ao mesmo
+tempo. O navegador é reciclado após um número de capturas ou quando deixa
+de responder, sempre sem abas abertas.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import async_playwright
+
+# Capturas antes de reiniciar o navegador (limita vazamento de memoria)
+RECICLAR_APOS = 24
+
+
+class PoolNavegador:
+    """Navegador Chromium quente compartilhado entre ciclos de envio."""
+
+    def __init__(
+        self,
+        headless: bool = True,
+        viewport: dict | None = None,
+        device_scale_factor: float = 2,
+        reciclar_apos: int = RECICLAR_APOS
+    ):
+        self.headless = headless
+        self.viewport = viewport
+        self.device_scale_factor = device_scale_factor
+        self.reciclar_apos = reciclar_apos
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._lock = asyncio.Lock()
+        self._abertas = 0
+        self._descartar = False
+        self.capturas = 0
+
+    async def _iniciar(self):
+        print("🌐 Iniciando navegador...")
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        self._context = await self._browser.new_context(
+            viewport=self.viewport,
+            device_scale_factor=self.device_scale_factor
+        )
+        self.capturas = 0
+        self._descartar = False
+
+    async def _encerrar_navegador(self):
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except PlaywrightError:
+                pass
+            print("🔒 Navegador fechado")
+        self._browser = None
+        self._context = None
+
+    def saudavel(self) -> bool:
+        """Indica se o navegador atual ainda pode ser usado."""
+        return (
+            self._browser is not None
+            and self._browser.is_connected()
+            and not self._descartar
+            and self.capturas < self.reciclar_apos
+        )
+
+    async def _reservar_aba(self):
+        async with self._lock:
+            conectado = self._browser is not None and self._browser.is_connected()
+            # Reciclagem por uso/erro espera as abas em andamento terminarem
+            if not (conectado and (self.saudavel() or self._abertas > 0)):
+                await self._encerrar_navegador()
+                await self._iniciar()
+            self._abertas += 1
+            self.capturas += 1
+
+    @asynccontextmanager
+    async def pagina(self):
+        """
+        Abre uma aba no contexto compartilhado.
+
+        O navegador é (re)iniciado se estiver ausente, desconectado ou tiver
+        atingido ``reciclar_apos`` capturas. Se a captura falhar com erro do
+        Playwright, o navegador é marcado para descarte no próximo uso.
+        """
+        await self._reservar_aba()
+        page = None
+        try:
+            page = await self._context.new_page()
+            yield page
+        except PlaywrightError:
+            self._descartar = True
+            raise
+        finally:
+            self._abertas -= 1
+            if page is not None and not page.is_closed():
+                try:
+                    await page.close()
+                except PlaywrightError:
+                    pass
+
+    async def fechar(self):
+        """Fecha o navegador e encerra o Playwright."""
+        await self._encerrar_navegador()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
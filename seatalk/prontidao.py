@@ -0,0 +1,88 @@
+"""
+Detecção de quando o dashboard Streamlit terminou de renderizar.
+
+Em vez de dormir um tempo fixo, a página é considerada pronta quando:
+- o container do app existe;
+- o Streamlit não está executando o script (status widget e spinners sumiram);
+- todas as tabelas ``stDataFrame`` visíveis já desenharam o canvas (as de
+  um expander fechado não são pintadas e não contam);
+- o DOM ficou sem mutações por uma janela curta.
+
+As condições são avaliadas em todos os frames da página, pois no Streamlit
+Cloud o app é servido dentro de um iframe.
+"""
+import asyncio
+import time
+
+from playwright.async_api import Error as PlaywrightError
+
+# Janela sem mutações no DOM para considerar a página estável (ms)
+ESTABILIDADE_MS = 1000
+
+# Intervalo de verificação da condição de prontidão (ms)
+INTERVALO_VERIFICACAO_MS = 200
+
+_SCRIPT_PRONTIDAO = """
+(estabilidadeMs) => {
+    if (!document.body) return false;
+    if (window.__ultimaMutacao === undefined) {
+        window.__ultimaMutacao = Date.now();
+        new MutationObserver(() => { window.__ultimaMutacao = Date.now(); })
+            .observe(document.body, {subtree: true, childList: true, characterData: true});
+        return false;
+    }
+    if (!document.querySelector('[data-testid="stAppViewContainer"]')) return false;
+    if (document.querySelector('[data-testid="stStatusWidget"]')) return false;
+    if (document.querySelector('[data-testid="stSpinner"], [data-testid="stSkeleton"]')) return false;
+
+    const tabelas = Array.from(document.querySelectorAll('[data-testid="stDataFrame"]')).filter(
+        (tabela) => tabela.offsetParent !== null && !tabela.closest('details:not([open])')
+    );
+    if (tabelas.length === 0) return false;
+    for (const tabela of tabelas) {
+        if (!tabela.querySelector('canvas')) return false;
+    }
+    return Date.now() - window.__ultimaMutacao >= estabilidadeMs;
+}
+"""
+
+
+async def _algum_frame_pronto(page, estabilidade_ms: int) -> bool:
+    # No Streamlit Cloud o app roda dentro de um iframe; verifica todos
+    for frame in page.frames:
+        try:
+            if await frame.evaluate(_SCRIPT_PRONTIDAO, estabilidade_ms):
+                return True
+        except PlaywrightError:
+            # Frame navegando ou destacado; tenta de novo na proxima rodada
+            continue
+    return False
+
+
+async def aguardar_dashboard_pronto(
+    page,
+    tempo_maximo: float,
+    estabilidade_ms: int = ESTABILIDADE_MS
+) -> float | None:
+    """
+    Aguarda o dashboard ficar pronto para captura.
+
+    Args:
+        page: Pagina do Playwright ja navegada para o dashboard
+        tempo_maximo: Limite de espera (segundos)
+        estabilidade_ms: Janela sem mutacoes exigida (ms)
+
+    Returns:
+        Segundos ate a pagina ficar pronta, ou None se o limite estourou
+    """
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < tempo_maximo:
+        if await _algum_frame_pronto(page, estabilidade_ms):
+            return time.perf_counter() - inicio
+        await asyncio.sleep(INTERVALO_VERIFICACAO_MS / 1000)
+    return None
+
+
+async def aguardar_quadro(page):
+    """Aguarda o navegador pintar o proximo quadro (ex.: apos um scroll)."""
+    await page.evaluate("() => new Promise(r => requestAnimationFrame(() => r()))")
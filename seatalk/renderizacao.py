@@ -0,0 +1,219 @@
+"""
+Renderização do Resumo Geral direto em imagem, sem navegador.
+
+Monta as mesmas tabelas da página (regional "Todas", estações SOC e FMH)
+com as funções de ``utils.resumo_geral`` e desenha com matplotlib,
+incluindo o gradiente ``Reds`` nas colunas de porcentagem.
+
+Os módulos de ``utils`` são importados sob demanda: dependem de pandas,
+gspread e streamlit, e exigem as credenciais do app
+(``.streamlit/secrets.toml`` ou ``credentials.json``).
+"""
+import io
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import pandas as pd  # noqa: E402
+from matplotlib.patches import Rectangle  # noqa: E402
+
+# Resolução da imagem (equivalente ao device_scale_factor=2 do navegador)
+DPI = 200
+
+# Medidas em polegadas
+ALTURA_LINHA = 0.32
+LARGURA_CARACTERE = 0.085
+PADDING_CELULA = 0.12
+MARGEM = 0.3
+ESPACO_SECAO = 0.35
+ALTURA_TITULO = 0.45
+
+TAMANHO_FONTE = 9
+COR_CABECALHO = "#f0f2f6"
+COR_BORDA = "#e6e9ef"
+COR_TEXTO = "#31333f"
+
+
+def _formatar(valor, formato: str | None) -> str:
+    if pd.isna(valor):
+        return ""
+    if formato:
+        try:
+            return formato.format(valor)
+        except (TypeError, ValueError):
+            pass
+    return str(valor)
+
+
+def _preparar_secao(titulo: str, df: pd.DataFrame, formatos: dict, colunas_gradiente: list) -> dict:
+    """Textos, cores e larguras de uma tabela."""
+    from utils.resumo_geral import cores_gradiente
+
+    colunas = list(df.columns)
+    textos = [
+        [_formatar(valor, formatos.get(col)) for col, valor in zip(colunas, linha)]
+        for linha in df.itertuples(index=False, name=None)
+    ]
+
+    fundos = [["white"] * len(colunas) for _ in textos]
+    cores_texto = [[COR_TEXTO] * len(colunas) for _ in textos]
+    for j, col in enumerate(colunas):
+        if col not in colunas_gradiente or df.empty:
+            continue
+        fundo, texto = cores_gradiente(df[col], cmap="Reds")
+        for i in range(len(textos)):
+            fundos[i][j] = tuple(fundo[i])
+            cores_texto[i][j] = tuple(texto[i])
+
+    larguras = [
+        max([len(str(col))] + [len(linha[j]) for linha in textos]) * LARGURA_CARACTERE
+        + 2 * PADDING_CELULA
+        for j, col in enumerate(colunas)
+    ]
+    numericas = [pd.api.types.is_numeric_dtype(df[col]) for col in colunas]
+    return {
+        "titulo": titulo,
+        "colunas": colunas,
+        "textos": textos,
+        "fundos": fundos,
+        "cores_texto": cores_texto,
+        "larguras": larguras,
+        "numericas": numericas,
+    }
+
+
+def _altura_secao(secao: dict) -> float:
+    return ALTURA_TITULO + ALTURA_LINHA * (len(secao["textos"]) + 1) + ESPACO_SECAO
+
+
+def _desenhar_secao(ax, secao: dict, topo: float):
+    """Desenha título e tabela a partir de ``topo`` (em polegadas)."""
+    ax.text(
+        MARGEM, topo + ALTURA_TITULO / 2, secao["titulo"],
+        fontsize=TAMANHO_FONTE + 5, fontweight="bold", color=COR_TEXTO, va="center"
+    )
+    y = topo + ALTURA_TITULO
+
+    linhas = [(secao["colunas"], [COR_CABECALHO] * len(secao["colunas"]), None)]
+    linhas += zip(secao["textos"], secao["fundos"], secao["cores_texto"])
+    for i, (textos, fundos, cores) in enumerate(linhas):
+        x = MARGEM
+        for j, texto in enumerate(textos):
+            largura = secao["larguras"][j]
+            ax.add_patch(Rectangle(
+                (x, y), largura, ALTURA_LINHA,
+                facecolor=fundos[j], edgecolor=COR_BORDA, linewidth=0.6
+            ))
+            direita = i > 0 and secao["numericas"][j]
+            ax.text(
+                x + largura - PADDING_CELULA if direita else x + PADDING_CELULA,
+                y + ALTURA_LINHA / 2,
+                str(texto),
+                fontsize=TAMANHO_FONTE,
+                color=COR_TEXTO if cores is None else cores[j],
+                fontweight="bold" if i == 0 else "normal",
+                ha="right" if direita else "left",
+                va="center",
+            )
+            x += largura
+        y += ALTURA_LINHA
+
+
+def renderizar_secoes(secoes: list[dict], titulo: str = "Resumo Geral") -> bytes:
+    """Desenha as tabelas empilhadas e retorna o PNG."""
+    largura = 2 * MARGEM + max([sum(s["larguras"]) for s in secoes] + [4])
+    altura = 2 * MARGEM + ALTURA_TITULO * 2 + sum(_altura_secao(s) for s in secoes)
+
+    fig = plt.figure(figsize=(largura, altura), dpi=DPI)
+    try:
+        ax = fig.add_axes((0, 0, 1, 1))
+        ax.set_xlim(0, largura)
+        ax.set_ylim(altura, 0)
+        ax.axis("off")
+
+        ax.text(
+            MARGEM, MARGEM + ALTURA_TITULO / 2, titulo,
+            fontsize=TAMANHO_FONTE + 12, fontweight="bold", color=COR_TEXTO, va="center"
+        )
+        ax.text(
+            MARGEM, MARGEM + ALTURA_TITULO * 1.5, "Visão consolidada das operações SOC e FMH",
+            fontsize=TAMANHO_FONTE, color="#808495", va="center"
+        )
+
+        topo = MARGEM + ALTURA_TITULO * 2
+        for secao in secoes:
+            _desenhar_secao(ax, secao, topo)
+            topo += _altura_secao(secao)
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=DPI, facecolor="white")
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def carregar_cubo():
+    """Cubo agregado do Resumo Geral, lido na hora da fonte configurada."""
+    from utils.data_loader import fonte_configurada
+
+    return fonte_configurada(sincronizar=True).criar_cubo()
+
+
+def _valor_filtro(indice: dict, coluna: str, valor, posicoes=None) -> str:
+    """Como na página: valor fora das opções volta para "Todas"."""
+    from utils.agregacoes import opcoes_indice
+
+    return valor if valor in opcoes_indice(indice, coluna, posicoes) else "Todas"
+
+
+def renderizar_resumo(cubo: pd.DataFrame, filtros: dict | None = None) -> bytes:
+    """
+    PNG com as tabelas do Resumo Geral para os filtros da tarefa.
+
+    Args:
+        cubo: Cubo agregado (``carregar_cubo``)
+        filtros: Mesmos query params da página (operacao, estacao, regional)
+
+    Returns:
+        bytes: Imagem PNG
+    """
+    from utils.agregacoes import criar_indice_filtros, filtrar_cubo, posicoes_filtro
+    from utils.resumo_geral import montar_tabelas, tabela_por_operacao, tabela_regional
+
+    inicio = time.perf_counter()
+    filtros = filtros or {}
+    indice = criar_indice_filtros(cubo)
+    operacao = _valor_filtro(indice, "operacao_origem", filtros.get("operacao"))
+    # Estações apenas da operação escolhida, como na página
+    estacao = _valor_filtro(
+        indice,
+        "origin_station_code",
+        filtros.get("estacao"),
+        posicoes_filtro(indice, {"operacao_origem": operacao}),
+    )
+    regional = _valor_filtro(indice, "regional", filtros.get("regional"))
+    cubo_filtrado = filtrar_cubo(cubo, operacao, estacao, regional, indice)
+    tabelas = montar_tabelas(cubo_filtrado)
+    formatos = tabelas["format"]
+
+    secoes = []
+    df_regional = tabela_regional(tabelas, "")
+    if df_regional is not None and not df_regional.empty:
+        secoes.append(_preparar_secao(
+            "Detalhamento por Regional - Todas", df_regional, formatos,
+            tabelas["colunas_pct_regional"]
+        ))
+    for operacao_tabela, ordenar in (("SOC", False), ("FMH", True)):
+        secoes.append(_preparar_secao(
+            f"Detalhamento por Estação - {operacao_tabela}",
+            tabela_por_operacao(tabelas, operacao_tabela, ordenar),
+            formatos,
+            tabelas["colunas_pct"],
+        ))
+
+    imagem = renderizar_secoes(secoes)
+    print(f"🖼️  Tabelas renderizadas em {time.perf_counter() - inicio:.2f}s ({len(imagem):,} bytes)")
+    return imagem
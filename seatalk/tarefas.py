@@ -0,0 +1,98 @@
+"""
+Lista de tarefas de envio (dashboard → grupos do SeaTalk).
+
+As tarefas vêm de um JSON (variável ``DASHBOARD_JOBS`` ou arquivo
+``DASHBOARD_JOBS_FILE``) no formato::
+
+    [
+        {
+            "nome": "Resumo Geral - SOC",
+            "url": "https://.../Resumo_Geral",
+            "filtros": {"operacao": "SOC"},
+            "webhooks": ["WEBHOOK_URL", "WEBHOOK_SOC"]
+        }
+    ]
+
+Cada webhook pode ser uma URL ou o nome de uma variável de ambiente (para
+manter as URLs nos secrets). ``url`` é opcional e assume a URL padrão.
+O nome identifica a tarefa (arquivo da imagem, impressão digital do último
+envio e caixa de saída) e deve ser único.
+"""
+import json
+import os
+import re
+import unicodedata
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+def _slug(nome: str) -> str:
+    texto = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "_", texto.lower()).strip("_")
+
+
+def montar_url(url: str, filtros: dict | None = None) -> str:
+    """Acrescenta os filtros como query params da URL."""
+    if not filtros:
+        return url
+    partes = urlsplit(url)
+    params = dict(parse_qsl(partes.query))
+    params.update({chave: str(valor) for chave, valor in filtros.items()})
+    return urlunsplit(partes._replace(query=urlencode(params)))
+
+
+def resolver_webhook(valor: str) -> str | None:
+    """Retorna a URL do webhook, lendo variavel de ambiente se necessario."""
+    if valor.startswith(("http://", "https://")):
+        return valor
+    return os.getenv(valor)
+
+
+def carregar_tarefas(url_padrao: str, webhook_padrao: str | None) -> list[dict]:
+    """
+    Monta a lista de tarefas de envio.
+
+    Sem configuração, retorna a tarefa única do "Resumo Geral" com
+    ``url_padrao`` e ``webhook_padrao``.
+
+    Returns:
+        Lista de dicts com nome, url, filtros, webhooks (URLs resolvidas) e
+        arquivo
+
+    Raises:
+        ValueError: Duas tarefas com o mesmo nome (ou com nomes que geram o
+            mesmo arquivo)
+    """
+    bruto = os.getenv("DASHBOARD_JOBS")
+    caminho = os.getenv("DASHBOARD_JOBS_FILE")
+    if not bruto and caminho:
+        with open(caminho, encoding="utf-8") as f:
+            bruto = f.read()
+
+    if not bruto:
+        return [{
+            "nome": "Resumo Geral",
+            "url": url_padrao,
+            "filtros": {},
+            "webhooks": [webhook_padrao] if webhook_padrao else [],
+            "arquivo": "dashboard_resumo_geral.png",
+        }]
+
+    tarefas = []
+    arquivos = {}
+    for item in json.loads(bruto):
+        nome = item["nome"]
+        arquivo = f"dashboard_{_slug(nome)}.png"
+        if arquivo in arquivos:
+            raise ValueError(
+                f"Tarefas com nome repetido em DASHBOARD_JOBS: {arquivos[arquivo]!r} e {nome!r}"
+            )
+        arquivos[arquivo] = nome
+        webhooks = [resolver_webhook(w) for w in item.get("webhooks", ["WEBHOOK_URL"])]
+        tarefas.append({
+            "nome": nome,
+            "url": montar_url(item.get("url", url_padrao), item.get("filtros")),
+            "filtros": item.get("filtros") or {},
+            "webhooks": [w for w in webhooks if w],
+            "arquivo": arquivo,
+        })
+    return tarefas
@@ -0,0 +1,162 @@
+"""
+Envio ao webhook e caixa de saída contra um servidor HTTP local.
+
+O ``ServidorFalso`` (``http.server`` em uma thread) registra cada POST
+recebido e responde, por caminho, com as respostas enfileiradas pelo teste
+(padrão: 200 com ``code`` 0). Cada caminho faz o papel de um webhook.
+"""
+import base64
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import enviar_dashboard_seatalk as envio
+from seatalk.caixa_saida import guardar, pendentes
+from seatalk.impressao import carregar_impressoes
+
+SUCESSO = (200, {}, {"code": 0, "message_id": "m"}, 0)
+
+
+class ServidorFalso:
+    def __init__(self):
+        self.recebidos: list[tuple[str, str, float]] = []
+        self.respostas = defaultdict(deque)
+        servidor = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            def do_POST(self):
+                corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                imagem = base64.b64decode(corpo["image_base64"]["content"]).decode()
+                servidor.recebidos.append((self.path, imagem, time.monotonic()))
+                fila = servidor.respostas[self.path]
+                status, cabecalhos, resposta, atraso = fila.popleft() if fila else SUCESSO
+                time.sleep(atraso)
+                conteudo = json.dumps(resposta).encode()
+                try:
+                    self.send_response(status)
+                    for nome, valor in cabecalhos.items():
+                        self.send_header(nome, valor)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(conteudo)))
+                    self.end_headers()
+                    self.wfile.write(conteudo)
+                except OSError:
+                    # Cliente desistiu (timeout de leitura)
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), Manipulador)
+        self.thread = threading.Thread(target=self.http.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, caminho: str) -> str:
+        return f"http://127.0.0.1:{self.http.server_address[1]}{caminho}"
+
+    def responder(self, caminho: str, *respostas):
+        self.respostas[caminho].extend(respostas)
+
+    def imagens(self, caminho: str | None = None) -> list[str]:
+        return [imagem for destino, imagem, _ in self.recebidos if caminho in (None, destino)]
+
+    def fechar(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+
+@pytest.fixture
+def servidor(tmp_path, monkeypatch):
+    monkeypatch.setattr(envio, "OUTBOX_DIR", str(tmp_path / "saida"))
+    monkeypatch.setattr(envio, "FINGERPRINT_FILE", str(tmp_path / "impressoes.json"))
+    monkeypatch.setattr(envio, "HTTP_RETRIES", 1)
+    monkeypatch.setattr(envio, "HTTP_BACKOFF", 0.01)
+    monkeypatch.setattr(envio, "HTTP_BACKOFF_MAX", 5)
+    monkeypatch.setattr(envio, "HTTP_TIMEOUT", 5)
+    servidor = ServidorFalso()
+    yield servidor
+    servidor.fechar()
+
+
+def erro(status: int, cabecalhos: dict | None = None) -> tuple:
+    return (status, cabecalhos or {}, {"code": status}, 0)
+
+
+def envios(*nomes: str) -> list[dict]:
+    return [{"descricao": nome, "payload": envio.build_payload(nome.encode())} for nome in nomes]
+
+
+def test_503_espera_o_retry_after(servidor, monkeypatch):
+    monkeypatch.setattr(envio, "HTTP_RETRIES", 2)
+    servidor.responder("/a", erro(503, {"Retry-After": "1"}))
+
+    resultado = envio.post_payload(envio.build_payload(b"x"), servidor.url("/a"), "x")
+
+    assert resultado["success"]
+    (_, _, primeiro), (_, _, segundo) = servidor.recebidos
+    # Sem o Retry-After a espera seria de no máximo HTTP_BACKOFF (0,01 s)
+    assert segundo - primeiro >= 0.9
+
+
+def test_timeout_de_leitura_no_post_nao_e_repetido(servidor, monkeypatch):
+    monkeypatch.setattr(envio, "HTTP_RETRIES", 3)
+    monkeypatch.setattr(envio, "HTTP_TIMEOUT", 0.3)
+    servidor.responder("/a", (*SUCESSO[:3], 1))
+
+    resultado = envio.send_to_seatalk([b"x"], servidor.url("/a"), "Tela", "Tela")
+
+    time.sleep(1)
+    assert not resultado["success"]
+    assert resultado["retryable"] is False
+    # Entrega incerta: nem nova tentativa nem caixa de saída
+    assert servidor.imagens() == ["x"]
+    assert pendentes(envio.OUTBOX_DIR) == []
+
+
+def test_blocos_restantes_ficam_na_caixa_e_saem_em_ordem_por_webhook(servidor):
+    a, b = servidor.url("/a"), servidor.url("/b")
+    impressao = {"dados": None, "imagem": "novo"}
+
+    # Falha no segundo bloco: só o 2 e o 3 vão para a caixa, como uma unidade
+    servidor.responder("/a", SUCESSO, erro(503))
+    resultado = envio.send_to_seatalk([b"x1", b"x2", b"x3"], a, "X", "X", impressao)
+    assert resultado["images"] == 1 and resultado["retryable"]
+    guardar(a, envios("y1"), "Y", envio.OUTBOX_DIR, "Y")
+    guardar(b, envios("z1"), "Z", envio.OUTBOX_DIR, "Z")
+    assert [item["envios"][0]["descricao"] for _, item in pendentes(envio.OUTBOX_DIR)] == [
+        "X (2/3)", "y1", "z1"
+    ]
+
+    # Reenvio: x2 entra, x3 falha; Y espera atrás de X, Z segue no outro webhook
+    servidor.recebidos.clear()
+    servidor.responder("/a", SUCESSO, erro(503))
+    entregues = envio.flush_outbox([a, b])
+    assert [item["tarefa"] for item in entregues] == ["Z"]
+    assert servidor.imagens("/a") == ["x2", "x3"]
+    assert [
+        [e["descricao"] for e in item["envios"]] for _, item in pendentes(envio.OUTBOX_DIR)
+    ] == [["X (3/3)"], ["y1"]]
+
+    servidor.recebidos.clear()
+    entregues = envio.flush_outbox([a, b])
+    envio.record_delivered(entregues)
+    assert servidor.imagens("/a") == ["x3", "y1"]
+    assert pendentes(envio.OUTBOX_DIR) == []
+    assert carregar_impressoes(envio.FINGERPRINT_FILE)["X"] == impressao
+
+
+def test_4xx_descarta_o_pendente_sem_repetir(servidor, monkeypatch):
+    monkeypatch.setattr(envio, "HTTP_RETRIES", 3)
+    a = servidor.url("/a")
+    guardar(a, envios("x1", "x2"), "X", envio.OUTBOX_DIR, "X", {"imagem": "novo"})
+    servidor.responder("/a", erro(400))
+
+    entregues = envio.flush_outbox([a])
+
+    assert entregues == []
+    assert servidor.imagens() == ["x1"]
+    assert pendentes(envio.OUTBOX_DIR) == []
@@ -0,0 +1,118 @@
+"""
+Prontidão do dashboard contra a página real, servida por ``streamlit run``.
+
+Usa uma fonte Parquet sintética e um histórico já gravado, de modo que o
+expander "Tendência" (fechado) contenha uma tabela que o navegador não
+pinta. Exige o Chromium do Playwright; sem ele o teste é pulado.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+import pytest
+
+from benchmarks.dados_sinteticos import gerar_viagens
+from seatalk.prontidao import aguardar_dashboard_pronto
+from utils.fontes import FonteArquivo
+from utils.historico import gravar_cubo
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINA = os.path.join(RAIZ, "pages", "1_Resumo_Geral.py")
+
+# Tabelas dentro de um expander fechado
+_SCRIPT_TABELAS_FECHADAS = """
+() => document.querySelectorAll('details:not([open]) [data-testid="stDataFrame"]').length
+"""
+
+
+def _porta_livre() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _aguardar_servidor(url: str, processo: subprocess.Popen, tempo_maximo: float = 60):
+    limite = time.monotonic() + tempo_maximo
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            pytest.fail(f"streamlit encerrou com código {processo.returncode}")
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=2):
+                return
+        except OSError:
+            time.sleep(0.5)
+    pytest.fail("streamlit não respondeu a tempo")
+
+
+@pytest.fixture(scope="module")
+def chromium():
+    playwright = pytest.importorskip("playwright.sync_api")
+    with playwright.sync_playwright() as p:
+        try:
+            p.chromium.launch().close()
+        except playwright.Error as erro:
+            pytest.skip(f"Chromium do Playwright indisponível: {erro}")
+
+
+@pytest.fixture(scope="module")
+def dashboard(tmp_path_factory, chromium):
+    """URL da página servida com dados sintéticos e histórico gravado."""
+    diretorio = tmp_path_factory.mktemp("app")
+    dados = os.path.join(diretorio, "viagens.parquet")
+    historico = os.path.join(diretorio, "historico")
+    gerar_viagens(5_000).to_parquet(dados, index=False)
+    gravar_cubo(FonteArquivo(dados).criar_cubo(), datetime.now(timezone.utc), historico)
+
+    os.makedirs(os.path.join(diretorio, ".streamlit"))
+    with open(os.path.join(diretorio, ".streamlit", "secrets.toml"), "w") as arquivo:
+        arquivo.write(
+            f'[fonte]\ntipo = "parquet"\ncaminho = "{dados}"\n\n'
+            f'[historico]\ncaminho = "{historico}"\n'
+        )
+
+    porta = _porta_livre()
+    url = f"http://127.0.0.1:{porta}"
+    processo = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", PAGINA,
+            "--server.headless", "true",
+            "--server.port", str(porta),
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=diretorio,
+        env={**os.environ, "PYTHONPATH": RAIZ},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _aguardar_servidor(url, processo)
+        yield url
+    finally:
+        processo.terminate()
+        processo.wait(timeout=10)
+
+
+def test_tabela_em_expander_fechado_nao_impede_a_prontidao(dashboard):
+    from playwright.async_api import async_playwright
+
+    async def medir():
+        async with async_playwright() as p:
+            navegador = await p.chromium.launch()
+            try:
+                pagina = await navegador.new_page(viewport={"width": 1400, "height": 900})
+                await pagina.goto(dashboard)
+                segundos = await aguardar_dashboard_pronto(pagina, tempo_maximo=45)
+                fechadas = await pagina.evaluate(_SCRIPT_TABELAS_FECHADAS)
+                return segundos, fechadas
+            finally:
+                await navegador.close()
+
+    segundos, fechadas = asyncio.run(medir())
+
+    assert fechadas > 0, "a página deveria ter uma tabela no expander Tendência fechado"
+    assert segundos is not None
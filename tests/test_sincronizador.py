@@ -0,0 +1,203 @@
+"""
+Sincronização incremental da aba ``db`` contra uma aba falsa em memória.
+
+A ``AbaFalsa`` responde a ``batch_get`` como a API do Google Sheets
+(intervalos A1, células vazias no fim das linhas e linhas vazias no fim do
+intervalo omitidas, ``range`` devolvido limitado à grade) e expõe
+``spreadsheet.get_lastUpdateTime``.
+"""
+import pandas as pd
+import pytest
+from gspread.utils import a1_range_to_grid_range, numericise_all, to_records
+
+from utils.data_loader import SincronizadorPlanilha
+
+CABECALHO = ["trip_number", "status_agrupado", "total_orders", "regional"]
+
+
+class PlanilhaFalsa:
+    def __init__(self):
+        self.revisao = 0
+
+    def get_lastUpdateTime(self) -> str:
+        return str(self.revisao)
+
+
+class Valores(list):
+    """Como ``gspread.worksheet.ValueRange``: lista com o ``range`` devolvido."""
+
+    def __init__(self, valores: list, intervalo: str):
+        super().__init__(valores)
+        self.range = intervalo
+
+
+class AbaFalsa:
+    def __init__(self, grade: list, linhas_vazias: int = 0):
+        self.grade = grade
+        # Linhas vazias da grade abaixo dos dados
+        self.linhas_vazias = linhas_vazias
+        self.spreadsheet = PlanilhaFalsa()
+        self.chamadas: list[list] = []
+
+    def alterar(self, grade: list | None = None):
+        """Nova revisão da planilha (opcionalmente com outra grade)."""
+        if grade is not None:
+            self.grade = grade
+        self.spreadsheet.revisao += 1
+
+    def batch_get(self, intervalos: list) -> list:
+        self.chamadas.append(list(intervalos))
+        respostas = []
+        for intervalo in intervalos:
+            if intervalo == "1:1":
+                respostas.append([self.grade[0]] if self.grade else [])
+                continue
+            letra, _, fim = intervalo.partition(":")
+            if letra == fim:
+                # Coluna inteira: o range devolvido vai até o fim da grade
+                intervalo = f"{letra}1:{letra}{len(self.grade) + self.linhas_vazias}"
+            respostas.append(Valores(self._valores(intervalo), f"db!{intervalo}"))
+        return respostas
+
+    def _valores(self, intervalo: str) -> list:
+        grade = a1_range_to_grid_range(intervalo)
+        valores = [
+            list(linha[grade["startColumnIndex"]:grade["endColumnIndex"]])
+            for linha in self.grade[grade["startRowIndex"]:grade["endRowIndex"]]
+        ]
+        for linha in valores:
+            while linha and linha[-1] == "":
+                linha.pop()
+        while valores and not valores[-1]:
+            valores.pop()
+        return valores
+
+    def registros(self, colunas: list | None = None) -> pd.DataFrame:
+        """O que ``get_all_records`` devolveria para a grade atual."""
+        df = pd.DataFrame(to_records(self.grade[0], [numericise_all(linha) for linha in self.grade[1:]]))
+        return df[colunas] if colunas else df
+
+
+def gerar_grade(linhas: int, cabecalho: list = CABECALHO) -> list:
+    grade = [list(cabecalho)]
+    for i in range(linhas):
+        grade.append([f"T{i}", "fechada" if i % 3 else "Created", str(i), "" if i % 5 else "SP"])
+    return grade
+
+
+def criar(linhas: int = 120, **opcoes) -> tuple[AbaFalsa, SincronizadorPlanilha]:
+    aba = AbaFalsa(gerar_grade(linhas))
+    opcoes = {"tamanho_bloco": 50, "janela_revalidacao": 10, "recarga_completa_a_cada": 100, **opcoes}
+    return aba, SincronizadorPlanilha(aba, **opcoes)
+
+
+def test_primeira_carga_equivale_a_get_all_records():
+    aba, sincronizador = criar()
+    pd.testing.assert_frame_equal(sincronizador.sincronizar(), aba.registros())
+    # Cabeçalho + coluna A, depois os três blocos de linhas em um único batch_get
+    assert aba.chamadas[1] == ["A2:D51", "A52:D101", "A102:D121"]
+
+
+def test_revisao_inalterada_devolve_o_mesmo_objeto_sem_ler_valores():
+    aba, sincronizador = criar()
+    dados = sincronizador.sincronizar()
+    chamadas = len(aba.chamadas)
+
+    assert sincronizador.sincronizar() is dados
+    assert len(aba.chamadas) == chamadas
+
+
+def test_linhas_acrescentadas_buscam_apenas_a_janela_e_as_novas():
+    aba, sincronizador = criar()
+    sincronizador.sincronizar()
+
+    aba.alterar(gerar_grade(130))
+    dados = sincronizador.sincronizar()
+
+    pd.testing.assert_frame_equal(dados, aba.registros())
+    # Janela de 10 linhas (111..120) + as 10 novas
+    assert aba.chamadas[-1] == ["A112:D131"]
+
+
+def test_janela_de_revalidacao_captura_mudancas_recentes():
+    aba, sincronizador = criar()
+    sincronizador.sincronizar()
+
+    aba.grade[118][1] = "Cancelled"   # dentro da janela
+    aba.alterar()
+    dados = sincronizador.sincronizar()
+
+    pd.testing.assert_frame_equal(dados, aba.registros())
+    assert aba.chamadas[-1] == ["A112:D121"]
+
+
+def test_mudanca_antes_da_janela_forca_recarga_completa():
+    aba, sincronizador = criar(colunas_verificacao=["status_agrupado"])
+    sincronizador.sincronizar()
+    # Sem mudança, só a janela é relida
+    aba.alterar()
+    sincronizador.sincronizar()
+    assert aba.chamadas[-2] == ["1:1", "A:A", "B:B"]
+    assert aba.chamadas[-1] == ["A112:D121"]
+
+    aba.grade[5][1] = "Cancelled"     # viagem antiga, fora da janela
+    aba.alterar()
+    dados = sincronizador.sincronizar()
+
+    pd.testing.assert_frame_equal(dados, aba.registros())
+    assert aba.chamadas[-1][0] == "A2:D51"
+
+
+def test_linha_com_coluna_a_vazia_conta_no_total():
+    grade = gerar_grade(120)
+    grade[50][0] = ""                 # no meio
+    aba = AbaFalsa(grade, linhas_vazias=30)
+    sincronizador = SincronizadorPlanilha(aba, tamanho_bloco=50, janela_revalidacao=10)
+    pd.testing.assert_frame_equal(sincronizador.sincronizar(), aba.registros())
+
+    # Linha nova no fim com a coluna A vazia
+    aba.grade.append(["", "Created", "120", "SP"])
+    aba.alterar()
+    dados = sincronizador.sincronizar()
+
+    pd.testing.assert_frame_equal(dados, aba.registros())
+    assert sincronizador.total_linhas == 121
+    # Janela + linhas da grade até o fim, vazias descartadas
+    assert aba.chamadas[-1] == ["A112:D152"]
+
+
+@pytest.mark.parametrize("alteracao", ["cabecalho", "remocao"])
+def test_cabecalho_alterado_ou_linhas_removidas_forcam_recarga_completa(alteracao):
+    aba, sincronizador = criar()
+    sincronizador.sincronizar()
+
+    if alteracao == "cabecalho":
+        aba.alterar(gerar_grade(120, CABECALHO[:3] + ["regiao"]))
+    else:
+        aba.alterar(gerar_grade(100))
+    dados = sincronizador.sincronizar()
+
+    pd.testing.assert_frame_equal(dados, aba.registros())
+    assert aba.chamadas[-1][0].startswith("A2:")
+
+
+def test_selecao_de_colunas_busca_uma_faixa_por_sequencia_contigua():
+    cabecalho = ["trip_number", "lixo", "status_agrupado", "total_orders", "lixo2", "regional"]
+    aba = AbaFalsa([cabecalho] + [
+        [f"T{i}", "x", "fechada", str(i), "y", "SP"] for i in range(60)
+    ])
+    selecionadas = ["trip_number", "status_agrupado", "total_orders", "regional"]
+    sincronizador = SincronizadorPlanilha(
+        aba, tamanho_bloco=50, janela_revalidacao=10,
+        selecionar_colunas=lambda nomes: [nome for nome in nomes if nome in selecionadas],
+    )
+
+    dados = sincronizador.sincronizar()
+
+    pd.testing.assert_frame_equal(dados, aba.registros(selecionadas))
+    assert aba.chamadas[1] == ["A2:A51", "C2:D51", "F2:F51", "A52:A61", "C52:D61", "F52:F61"]
+
+    aba.alterar(aba.grade + [["T60", "x", "Created", "60", "y", "RJ"]])
+    dados = sincronizador.sincronizar()
+    pd.testing.assert_frame_equal(dados, aba.registros(selecionadas))
+    assert aba.chamadas[-1] == ["A52:A62", "C52:D62", "F52:F62"]
@@ -0,0 +1,372 @@
+"""
+Agregações do Resumo Geral.
+
+Os dados de viagens são reduzidos uma única vez a um cubo aditivo na menor
+granularidade exibida (operação × estação × regional × status). Todas as
+tabelas da página e as combinações de filtros são derivadas somando células
+do cubo e recalculando as porcentagens, sem voltar às linhas brutas.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from .instrumentacao import instrumentar
+
+CHAVES_CUBO = ["operacao_origem", "origin_station_code", "regional", "status_agrupado"]
+
+CANDIDATOS_ADERENCIA_CANCELAMENTO = [
+    "aderenciacancelamento",
+    "aderenciacancelamentook"
+]
+CANDIDATOS_CONTAGEM_CANCELAMENTOS = [
+    "contagemcancelamentos",
+    "contagemcancelamento",
+    "qtdcancelamentos",
+    "quantidadecancelamentos"
+]
+
+COLUNAS_CANCELAMENTO = ["soma_aderencia_cancelamento", "contagem_cancelamentos"]
+COLUNAS_CPT = ["CPT Delay", "CPT Trips"]
+COLUNAS_ETA = ["ETA Delay", "ETA Trips"]
+
+GRUPO_SEM_REGIONAL = "Sem Regional"
+
+# Chaves do cubo usadas nos filtros da página
+COLUNAS_FILTRO = ["operacao_origem", "origin_station_code", "regional"]
+
+# Colunas da aba lidas pelo dashboard, além das de cancelamento (candidatos)
+COLUNAS_PLANILHA = [
+    "trip_number",
+    "origin_station_code",
+    "regional",
+    "status_agrupado",
+    "status_cpt",
+    "cpt_origin_realized",
+    "status_eta",
+    "eta_origin_realized",
+    "total_orders",
+]
+
+
+def normalizar_nome_coluna(nome: str) -> str:
+    return (
+        nome.strip()
+        .lower()
+        .replace("_", "")
+        .replace(" ", "")
+    )
+
+
+def resolver_coluna(colunas, candidatos: list) -> str | None:
+    """Primeira coluna de ``colunas`` cujo nome normalizado está em ``candidatos``."""
+    mapa = {normalizar_nome_coluna(col): col for col in colunas}
+    for candidato in candidatos:
+        if candidato in mapa:
+            return mapa[candidato]
+    return None
+
+
+def obter_coluna(df_base: pd.DataFrame, candidatos: list) -> str | None:
+    return resolver_coluna(df_base.columns, candidatos)
+
+
+def colunas_utilizadas(cabecalho: list) -> list:
+    """Colunas do cabeçalho da aba que o dashboard usa, na ordem da aba."""
+    nomes = {col for col in COLUNAS_PLANILHA if col in cabecalho}
+    for candidatos in (CANDIDATOS_ADERENCIA_CANCELAMENTO, CANDIDATOS_CONTAGEM_CANCELAMENTOS):
+        coluna = resolver_coluna(cabecalho, candidatos)
+        if coluna is not None:
+            nomes.add(coluna)
+    return [col for col in cabecalho if col in nomes]
+
+
+def _realizado(coluna: pd.Series) -> pd.Series:
+    """Indica linhas com data de realização preenchida."""
+    if pd.api.types.is_datetime64_any_dtype(coluna):
+        return coluna.notna()
+    return coluna.notna() & (coluna != "")
+
+
+@instrumentar()
+def criar_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reduz as viagens ao cubo aditivo de contagens.
+
+    Cada célula guarda a quantidade de viagens e os numeradores/denominadores
+    de cancelamento, CPT e ETA. Medidas cujas colunas de origem não existem
+    são omitidas.
+
+    Args:
+        df: DataFrame preparado por ``preparar_dados``.
+
+    Returns:
+        DataFrame com as chaves de ``CHAVES_CUBO`` presentes e as medidas.
+    """
+    chaves = [col for col in CHAVES_CUBO if col in df.columns]
+    possui_viagem = df["trip_number"].notna()
+    medidas = {col: df[col] for col in chaves}
+    medidas["viagens"] = possui_viagem
+
+    col_aderencia = obter_coluna(df, CANDIDATOS_ADERENCIA_CANCELAMENTO)
+    col_contagem = obter_coluna(df, CANDIDATOS_CONTAGEM_CANCELAMENTOS)
+    if col_aderencia and col_contagem:
+        medidas["soma_aderencia_cancelamento"] = df[col_aderencia]
+        medidas["contagem_cancelamentos"] = df[col_contagem]
+
+    if "cpt_origin_realized" in df.columns and "status_cpt" in df.columns:
+        cpt_realizado = _realizado(df["cpt_origin_realized"])
+        medidas["CPT Delay"] = cpt_realizado & (df["status_cpt"] == "DELAY")
+        medidas["CPT Trips"] = cpt_realizado & possui_viagem
+
+    if "eta_origin_realized" in df.columns and "status_eta" in df.columns:
+        eta_realizado = _realizado(df["eta_origin_realized"])
+        medidas["ETA Delay"] = eta_realizado & (df["status_eta"] == "DELAY")
+        medidas["ETA Trips"] = eta_realizado & possui_viagem
+
+    cubo = (
+        pd.DataFrame(medidas)
+        .groupby(chaves, dropna=False, observed=True, sort=False)
+        .sum()
+        .reset_index()
+    )
+    # Chaves categóricas voltam a texto: o cubo é pequeno e precisa aceitar
+    # rótulos novos (ex.: "Sem Regional") nas derivações
+    for col in chaves:
+        if isinstance(cubo[col].dtype, pd.CategoricalDtype):
+            cubo[col] = cubo[col].astype(object)
+    return cubo[cubo["operacao_origem"].notna()].reset_index(drop=True)
+
+
+def impressao_digital(df: pd.DataFrame) -> str:
+    """
+    Hash do conteúdo de uma tabela, independente da ordem das linhas.
+
+    Usado para detectar se os dados por trás do dashboard mudaram.
+    """
+    hashes = np.sort(pd.util.hash_pandas_object(df, index=False).to_numpy())
+    conteudo = hashlib.sha256("|".join(map(str, df.columns)).encode())
+    conteudo.update(hashes.tobytes())
+    return conteudo.hexdigest()
+
+
+def criar_indice_filtros(cubo: pd.DataFrame) -> dict:
+    """
+    Índice das chaves de filtro do cubo.
+
+    Para cada coluna de ``COLUNAS_FILTRO``: os valores em ordem, o código de
+    cada linha (-1 para vazio) e as posições das linhas por valor. Filtros e
+    opções saem da interseção de posições, sem comparar strings. Os arrays
+    são somente leitura, pois o índice é compartilhado entre sessões.
+    """
+    indice = {}
+    for coluna in COLUNAS_FILTRO:
+        if coluna not in cubo.columns:
+            continue
+        codigos, valores = pd.factorize(cubo[coluna], sort=True)
+        ordem = np.argsort(codigos, kind="stable")
+        codigos.flags.writeable = False
+        ordem.flags.writeable = False
+        limites = np.searchsorted(codigos[ordem], np.arange(len(valores) + 1))
+        indice[coluna] = {
+            "valores": list(valores),
+            "codigos": codigos,
+            "linhas": {
+                valor: ordem[limites[i]:limites[i + 1]]
+                for i, valor in enumerate(valores)
+            },
+        }
+    return indice
+
+
+def posicoes_filtro(indice: dict, selecao: dict) -> np.ndarray | None:
+    """
+    Posições das linhas do cubo que atendem a ``selecao`` ({coluna: valor}).
+
+    "Todas" e colunas ausentes do índice não filtram. Retorna None quando
+    nada é filtrado (todas as linhas).
+    """
+    posicoes = None
+    for coluna, valor in selecao.items():
+        if valor == "Todas" or coluna not in indice:
+            continue
+        linhas = indice[coluna]["linhas"].get(valor, np.empty(0, dtype=np.intp))
+        posicoes = linhas if posicoes is None else np.intersect1d(posicoes, linhas, assume_unique=True)
+    return posicoes
+
+
+def opcoes_indice(indice: dict, coluna: str, posicoes: np.ndarray | None = None) -> list:
+    """Valores de uma chave, ordenados, restritos às ``posicoes`` se informadas."""
+    if coluna not in indice:
+        return []
+    valores = indice[coluna]["valores"]
+    if posicoes is None:
+        return list(valores)
+    codigos = np.unique(indice[coluna]["codigos"][posicoes])
+    return [valores[c] for c in codigos if c >= 0]
+
+
+@instrumentar()
+def filtrar_cubo(
+    cubo: pd.DataFrame,
+    operacao: str = "Todas",
+    estacao: str = "Todas",
+    regional: str = "Todas",
+    indice: dict | None = None
+) -> pd.DataFrame:
+    """
+    Restringe o cubo aos valores selecionados ("Todas" não filtra).
+
+    ``indice`` (de ``criar_indice_filtros``) evita reconstruí-lo a cada
+    chamada.
+    """
+    if indice is None:
+        indice = criar_indice_filtros(cubo)
+    posicoes = posicoes_filtro(indice, {
+        "operacao_origem": operacao,
+        "origin_station_code": estacao,
+        "regional": regional,
+    })
+    return cubo if posicoes is None else cubo.iloc[posicoes]
+
+
+def _somar_cubo(cubo: pd.DataFrame, chaves: list, grupo_col: str) -> tuple[pd.DataFrame, list]:
+    """
+    Soma as células do cubo por ``chaves``.
+
+    Returns:
+        Tupla (tabela com uma coluna por status seguida das medidas, status).
+    """
+    grupo = (
+        cubo[grupo_col]
+        .fillna(GRUPO_SEM_REGIONAL)
+        .replace(["", "#N/A"], GRUPO_SEM_REGIONAL)
+    )
+    cubo = cubo.assign(**{grupo_col: grupo})
+    com_status = cubo[cubo["status_agrupado"].notna()]
+
+    contagens = (
+        com_status.groupby(chaves + ["status_agrupado"], observed=True)["viagens"]
+        .sum()
+        .unstack(fill_value=0)
+    )
+    colunas_status = sorted(contagens.columns)
+    contagens = contagens[colunas_status]
+    contagens.columns = list(colunas_status)
+
+    medidas = [
+        col for col in COLUNAS_CANCELAMENTO + COLUNAS_CPT + COLUNAS_ETA
+        if col in cubo.columns
+    ]
+    somas = cubo.groupby(chaves, observed=True)[medidas].sum()
+
+    tabela = contagens.join(somas, how="left").reset_index()
+    return tabela, colunas_status
+
+
+def _calcular_percentuais(
+    tabela: pd.DataFrame,
+    colunas_status: list,
+    escala_cancelamento: int = 1
+) -> pd.DataFrame:
+    """Adiciona Total e porcentagens à tabela de somas (na ordem da página)."""
+    tabela["Total"] = tabela[colunas_status].sum(axis=1)
+    for status in colunas_status:
+        tabela[f"% {status}"] = (tabela[status] / tabela["Total"] * 100).round(2)
+
+    if all(col in tabela.columns for col in COLUNAS_CANCELAMENTO):
+        soma = tabela.pop("soma_aderencia_cancelamento")
+        contagem = tabela.pop("contagem_cancelamentos")
+        tabela["%Cancel Nok"] = (
+            soma / contagem.replace(0, pd.NA)
+        ).mul(escala_cancelamento).fillna(0.0).round(2)
+        tabela["soma_aderencia_cancelamento"] = soma
+        tabela["contagem_cancelamentos"] = contagem
+    else:
+        tabela["%Cancel Nok"] = 0.0
+        tabela["soma_aderencia_cancelamento"] = 0
+        tabela["contagem_cancelamentos"] = 0
+
+    for prefixo, colunas in (("CPT", COLUNAS_CPT), ("ETA", COLUNAS_ETA)):
+        if all(col in tabela.columns for col in colunas):
+            delay = tabela.pop(f"{prefixo} Delay")
+            trips = tabela.pop(f"{prefixo} Trips")
+            tabela[f"% {prefixo}"] = (
+                delay / trips.replace(0, pd.NA)
+            ).mul(100).fillna(0.0).round(2)
+            tabela[f"{prefixo} Delay"] = delay
+            tabela[f"{prefixo} Trips"] = trips
+        else:
+            tabela[f"% {prefixo}"] = 0.0
+            tabela[f"{prefixo} Delay"] = 0.0
+            tabela[f"{prefixo} Trips"] = 0.0
+
+    return tabela
+
+
+@instrumentar()
+def criar_pivot_por_operacao(cubo: pd.DataFrame):
+    """Cria pivot table agrupando por operação e status."""
+    df_pivot = (
+        cubo[cubo["status_agrupado"].notna()]
+        .groupby(["operacao_origem", "status_agrupado"], observed=True)["viagens"]
+        .sum()
+        .unstack(fill_value=0)
+    )
+    df_pivot = df_pivot[sorted(df_pivot.columns)]
+
+    df_pivot["Total"] = df_pivot.sum(axis=1)
+    status_cols = [col for col in df_pivot.columns if col != "Total"]
+
+    for status in status_cols:
+        df_pivot[f"% {status}"] = (df_pivot[status] / df_pivot["Total"] * 100).round(2)
+
+    return df_pivot, status_cols
+
+
+@instrumentar()
+def criar_tabela_detalhada_por_grupo(
+    cubo: pd.DataFrame,
+    status_cols: list,
+    grupo_col: str,
+    grupo_label: str
+):
+    """Cria tabela detalhada por operação e agrupamento a partir do cubo."""
+    if grupo_col not in cubo.columns:
+        return pd.DataFrame(columns=["Operação", grupo_label]), []
+
+    tabela, colunas_status = _somar_cubo(cubo, ["operacao_origem", grupo_col], grupo_col)
+    tabela = _calcular_percentuais(tabela, colunas_status)
+
+    tabela = tabela.rename(columns={"operacao_origem": "Operação", grupo_col: grupo_label})
+    colunas_pct = [f"% {s}" for s in colunas_status] + ["%Cancel Nok", "% CPT", "% ETA"]
+
+    return tabela.sort_values(["Operação", grupo_label]), colunas_pct
+
+
+@instrumentar()
+def criar_tabela_detalhada(cubo: pd.DataFrame, status_cols: list):
+    """Cria tabela detalhada por estação."""
+    return criar_tabela_detalhada_por_grupo(cubo, status_cols, "origin_station_code", "Estação")
+
+
+@instrumentar()
+def criar_tabela_consolidada_por_grupo(
+    cubo: pd.DataFrame,
+    grupo_col: str,
+    grupo_label: str
+) -> pd.DataFrame:
+    """
+    Cria tabela por agrupamento somando todas as operações.
+
+    Diferente da tabela detalhada, ``%Cancel Nok`` é expresso em pontos
+    percentuais e as colunas auxiliares de cancelamento são removidas.
+    """
+    if grupo_col not in cubo.columns:
+        return pd.DataFrame(columns=[grupo_label])
+
+    tabela, colunas_status = _somar_cubo(cubo, [grupo_col], grupo_col)
+    tabela = _calcular_percentuais(tabela, colunas_status, escala_cancelamento=100)
+    tabela = tabela.drop(columns=COLUNAS_CANCELAMENTO)
+
+    return tabela.rename(columns={grupo_col: grupo_label}).sort_values(grupo_label)
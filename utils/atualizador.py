@@ -0,0 +1,141 @@
+"""
+Atualização dos dados em segundo plano (stale-while-revalidate).
+
+Uma thread recarrega os dados periodicamente e troca a versão atual de uma
+só vez quando a carga termina; enquanto isso, as leituras continuam
+recebendo a versão anterior. Só a primeira carga (sem versão inicial, ex.:
+sem snapshot) é feita na chamada de quem pediu os dados.
+"""
+import logging
+import threading
+from datetime import datetime, timezone
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre recargas (bem abaixo de uma hora, o antigo TTL do cache)
+INTERVALO_ATUALIZACAO = 15 * 60
+# Espera antes de tentar de novo após uma falha
+ESPERA_FALHA = 60
+
+
+class AtualizadorDados:
+    """
+    Mantém a versão atual dos dados e a renova em uma thread.
+
+    Cada versão é um dict com ``dados``, ``atualizado_em`` (quando os dados
+    foram lidos da origem, em UTC) e ``numero``. ``carregar`` é chamado
+    sempre na thread de atualização, exceto na primeira carga; se devolver
+    o mesmo objeto da versão atual (origem sem alterações), apenas
+    ``verificado_em`` avança.
+
+    Os dados de uma versão são compartilhados, sem cópia, por todos os
+    leitores e devem ser tratados como somente leitura.
+
+    ``ao_trocar`` é chamado com cada nova versão publicada por uma carga
+    (não com a versão inicial), na thread que carregou; uma falha nele é
+    registrada em log e não afeta a versão.
+    """
+
+    def __init__(
+        self,
+        carregar,
+        intervalo: float = INTERVALO_ATUALIZACAO,
+        espera_falha: float = ESPERA_FALHA,
+        inicial: pd.DataFrame | None = None,
+        inicial_em: datetime | None = None,
+        ao_trocar=None
+    ):
+        self.carregar = carregar
+        self.ao_trocar = ao_trocar
+        self.intervalo = intervalo
+        self.espera_falha = espera_falha
+        self.verificado_em: datetime | None = None
+        self.ultimo_erro: str | None = None
+        self._versao = None
+        self._lock = threading.Lock()
+        # Serializa as cargas (primeira carga concorrente com a thread)
+        self._carga = threading.RLock()
+        self._thread: threading.Thread | None = None
+        self._parar = threading.Event()
+        if inicial is not None:
+            self._versao = {
+                "dados": inicial,
+                "atualizado_em": inicial_em or datetime.now(timezone.utc),
+                "numero": 1,
+            }
+
+    def _trocar(self, dados: pd.DataFrame) -> bool:
+        """Publica ``dados`` como nova versão; False se nada mudou."""
+        agora = datetime.now(timezone.utc)
+        with self._lock:
+            self.verificado_em = agora
+            self.ultimo_erro = None
+            atual = self._versao
+            if atual is not None and dados is atual["dados"]:
+                return False
+            numero = atual["numero"] + 1 if atual else 1
+            # Atribuição única: leitores veem a versão antiga ou a nova inteira
+            self._versao = {"dados": dados, "atualizado_em": agora, "numero": numero}
+        return True
+
+    def atualizar(self, estrito: bool = False) -> dict:
+        """
+        Recarrega agora, na thread atual.
+
+        Args:
+            estrito: Propaga a falha da carga mesmo havendo versão anterior
+                (quem precisa dos dados do momento, e não de qualquer versão)
+
+        Returns:
+            A versão vigente após a recarga (a anterior, se a carga falhar,
+            já houver uma e ``estrito`` for falso)
+        """
+        with self._carga:
+            try:
+                dados = self.carregar()
+            except Exception as erro:
+                self.ultimo_erro = str(erro)
+                if estrito or self._versao is None:
+                    raise
+                logger.warning("Falha ao atualizar os dados, mantendo a versão anterior: %s", erro)
+                return self._versao
+            if self._trocar(dados) and self.ao_trocar is not None:
+                try:
+                    self.ao_trocar(self._versao)
+                except Exception:
+                    logger.exception("Falha ao processar a nova versão dos dados")
+        return self._versao
+
+    def _executar(self):
+        espera = 0 if self.verificado_em is None else self.intervalo
+        while not self._parar.wait(espera):
+            self.atualizar()
+            espera = self.intervalo if self.ultimo_erro is None else self.espera_falha
+
+    def iniciar(self):
+        """Inicia a thread de atualização (uma única vez)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._executar, name="atualizar-dados", daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        """Encerra a thread de atualização após a carga em andamento."""
+        self._parar.set()
+
+    def versao(self) -> dict:
+        """
+        Versão atual, sem esperar pela origem.
+
+        Na primeira chamada sem versão inicial a carga é feita aqui; em
+        seguida a thread de atualização é iniciada.
+        """
+        if self._versao is None:
+            with self._carga:
+                if self._versao is None:
+                    self.atualizar()
+        self.iniciar()
+        return self._versao
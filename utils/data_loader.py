@@ -2,23 +2,253 @@
 Módulo para carregamento de dados do Google Sheets.
 Centraliza a conexão e cache dos dados.
 """
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
 import gspread
 import pandas as pd
 import streamlit as st
+from gspread.utils import a1_range_to_grid_range, numericise_all, rowcol_to_a1
+
+from .agregacoes import (
+    CANDIDATOS_ADERENCIA_CANCELAMENTO,
+    CANDIDATOS_CONTAGEM_CANCELAMENTOS,
+    colunas_utilizadas,
+    obter_coluna,
+)
+from .atualizador import INTERVALO_ATUALIZACAO, AtualizadorDados
+from .fontes import FonteDados, criar_fonte
+from .historico import CAMINHO_HISTORICO, gravar_cubo
+from .instrumentacao import anotar, instrumentar
+from .snapshot import CAMINHO_SNAPSHOT, ler_snapshot, salvar_snapshot, tipar_para_arrow
+
+logger = logging.getLogger(__name__)
 
 # URL da planilha Google Sheets
 SPREADSHEET_URL = "https://docs.google.com/spreadsheets/d/1t1xG7KSqMEqn1sOw5ZYf6XkZhgCzAj3GG2ohLvaK3oE/edit?gid=1641678056#gid=1641678056"
 WORKSHEET_NAME = "db"
 
+# Esquema aplicado em preparar_dados
+COLUNAS_CATEGORICAS = [
+    "status_agrupado",
+    "status_cpt",
+    "status_eta",
+    "regional",
+    "origin_station_code",
+]
+COLUNAS_DATA = ["cpt_origin_realized", "eta_origin_realized"]
 
-@st.cache_data(ttl=3600)  # Cache por 1 hora
-def carregar_dados_sheets() -> pd.DataFrame:
+
+# Linhas por intervalo A1 em cada batch_get
+TAMANHO_BLOCO = 5000
+# Últimas linhas já conhecidas que são relidas a cada sincronização,
+# pois viagens recentes ainda mudam de status
+JANELA_REVALIDACAO = 2000
+# A cada N sincronizações a aba é relida por completo
+RECARGA_COMPLETA_A_CADA = 24
+# Colunas lidas inteiras a cada sincronização, junto com a coluna A, para
+# detectar edições fora da janela de revalidação (ex.: status de viagens antigas)
+COLUNAS_VERIFICACAO = ["status_agrupado"]
+
+
+class SincronizadorPlanilha:
     """
-    Carrega dados do Google Sheets com cache.
-    
-    Returns:
-        DataFrame com os dados da planilha.
+    Mantém uma cópia residente da aba e a atualiza de forma incremental.
+
+    A cada sincronização consulta a revisão da planilha (Drive
+    ``modifiedTime``); se não mudou, devolve a cópia residente sem ler
+    valores. Caso contrário lê o cabeçalho, a coluna A e as
+    ``colunas_verificacao`` e busca, em um único ``batch_get``, apenas as
+    linhas acrescentadas e a janela final de revalidação. Mudança de
+    cabeçalho, remoção de linhas, qualquer diferença nas colunas lidas
+    inteiras antes da janela ou o ciclo ``recarga_completa_a_cada`` forçam a
+    releitura completa.
+
+    Com ``selecionar_colunas`` (cabeçalho -> nomes), só essas colunas são
+    buscadas: cada sequência contígua vira um intervalo A1 no mesmo
+    ``batch_get``.
+
+    O total de linhas vem da extensão do intervalo devolvido para a coluna A
+    (``ValueRange.range``, o tamanho da grade), e as linhas vazias no fim
+    são descartadas; assim, linhas com a coluna A em branco também contam.
+    Qualquer objeto com ``batch_get`` (e, opcionalmente,
+    ``spreadsheet.get_lastUpdateTime``) serve como aba.
     """
+
+    def __init__(
+        self,
+        aba,
+        tamanho_bloco: int = TAMANHO_BLOCO,
+        janela_revalidacao: int = JANELA_REVALIDACAO,
+        recarga_completa_a_cada: int = RECARGA_COMPLETA_A_CADA,
+        selecionar_colunas=None,
+        colunas_verificacao: list | None = None
+    ):
+        self.aba = aba
+        self.tamanho_bloco = tamanho_bloco
+        self.janela_revalidacao = janela_revalidacao
+        self.recarga_completa_a_cada = recarga_completa_a_cada
+        self.selecionar_colunas = selecionar_colunas
+        self.colunas_verificacao = colunas_verificacao or []
+        self.cabecalho: list = []
+        # Posições (0 = coluna A) e nomes das colunas buscadas
+        self.indices: list[int] = []
+        self.colunas: list = []
+        self.total_linhas = 0
+        self.revisao: str | None = None
+        # Hash das colunas verificadas nas linhas que ficam fora da próxima janela
+        self.assinatura: int | None = None
+        self.dados = pd.DataFrame()
+        self.sincronizacoes = 0
+        self._lock = threading.Lock()
+
+    def _obter_revisao(self) -> str | None:
+        try:
+            return self.aba.spreadsheet.get_lastUpdateTime()
+        except (AttributeError, gspread.exceptions.GSpreadException):
+            return None
+
+    def _intervalos_verificacao(self) -> list[str]:
+        """Coluna A e colunas verificadas (pelo cabeçalho conhecido), inteiras."""
+        letras = ["A"] + [
+            rowcol_to_a1(1, self.cabecalho.index(nome) + 1).rstrip("0123456789")
+            for nome in self.colunas_verificacao
+            if nome in self.cabecalho[1:]
+        ]
+        return [f"{letra}:{letra}" for letra in letras]
+
+    def _assinar(self, colunas: list, linhas: int) -> int:
+        """Hash das ``linhas`` primeiras linhas de dados das colunas lidas inteiras."""
+        return hash(tuple(tuple(map(tuple, coluna[1:linhas + 1])) for coluna in colunas))
+
+    @staticmethod
+    def _extensao(valores) -> int:
+        """Linhas da grade cobertas pelo intervalo devolvido (com as vazias)."""
+        intervalo = getattr(valores, "range", None)
+        if intervalo:
+            fim = a1_range_to_grid_range(intervalo.rsplit("!", 1)[-1]).get("endRowIndex")
+            if fim is not None:
+                return max(fim, len(valores))
+        return len(valores)
+
+    def _definir_colunas(self, cabecalho: list):
+        selecionadas = set(self.selecionar_colunas(cabecalho)) if self.selecionar_colunas else None
+        self.indices = [
+            i for i, nome in enumerate(cabecalho)
+            if selecionadas is None or nome in selecionadas
+        ] or list(range(len(cabecalho)))
+        self.colunas = [cabecalho[i] for i in self.indices]
+
+    def _faixas_colunas(self) -> list[tuple[int, int]]:
+        """Sequências contíguas de ``indices`` (início e fim inclusivos)."""
+        faixas = []
+        for i in self.indices:
+            if faixas and i == faixas[-1][1] + 1:
+                faixas[-1] = (faixas[-1][0], i)
+            else:
+                faixas.append((i, i))
+        return faixas
+
+    def _buscar_linhas(self, inicio: int, fim: int, extras: tuple = ()) -> tuple[pd.DataFrame, list]:
+        """
+        Busca as linhas de dados ``inicio``..``fim`` (1 = primeira após o cabeçalho).
+
+        Linhas vazias no fim (resto da grade) são descartadas. Os intervalos
+        ``extras`` vão no mesmo ``batch_get`` e seus valores são devolvidos
+        como estão, junto com o DataFrame.
+        """
+        blocos = [
+            (ini, min(ini + self.tamanho_bloco - 1, fim))
+            for ini in range(inicio, fim + 1, self.tamanho_bloco)
+        ]
+        faixas = self._faixas_colunas()
+        intervalos = [
+            f"{rowcol_to_a1(ini + 1, col_ini + 1)}:{rowcol_to_a1(fim_bloco + 1, col_fim + 1)}"
+            for ini, fim_bloco in blocos
+            for col_ini, col_fim in faixas
+        ]
+        if not intervalos and not extras:
+            return pd.DataFrame(columns=self.colunas), []
+        respostas = iter(self.aba.batch_get(intervalos + list(extras)))
+
+        linhas = []
+        for ini, fim_bloco in blocos:
+            altura = fim_bloco - ini + 1
+            partes = []
+            for col_ini, col_fim in faixas:
+                largura = col_fim - col_ini + 1
+                valores = list(next(respostas))
+                valores += [[]] * (altura - len(valores))
+                partes.append([list(linha) + [""] * (largura - len(linha)) for linha in valores])
+            linhas.extend(
+                numericise_all([valor for parte in linha for valor in parte])
+                for linha in zip(*partes)
+            )
+        while linhas and all(valor == "" for valor in linhas[-1]):
+            linhas.pop()
+        return pd.DataFrame(linhas, columns=self.colunas), list(respostas)
+
+    def sincronizar(self) -> pd.DataFrame:
+        """
+        Atualiza a cópia residente.
+
+        Returns:
+            DataFrame equivalente a ``get_all_records`` da aba, restrito às
+            colunas selecionadas.
+        """
+        with self._lock:
+            revisao = self._obter_revisao()
+            if revisao is not None and revisao == self.revisao:
+                return self.dados
+
+            verificacao = self._intervalos_verificacao()
+            cabecalho, *colunas = self.aba.batch_get(["1:1", *verificacao])
+            cabecalho = list(cabecalho[0]) if cabecalho else []
+            # Limite superior: linhas da grade, inclusive as vazias no fim
+            limite = max(self._extensao(colunas[0]) - 1, 0)
+            inicio = max(1, self.total_linhas - self.janela_revalidacao + 1)
+
+            completa = (
+                cabecalho != self.cabecalho
+                or limite < self.total_linhas
+                or self._assinar(colunas, inicio - 1) != self.assinatura
+                or self.sincronizacoes % self.recarga_completa_a_cada == 0
+            )
+            extras = ()
+            if completa:
+                inicio = 1
+                self._definir_colunas(cabecalho)
+                self.cabecalho = cabecalho
+                # Com outro cabeçalho as colunas verificadas podem ter mudado de lugar
+                if self._intervalos_verificacao() != verificacao:
+                    extras = tuple(self._intervalos_verificacao())
+            novas, valores_extras = (
+                self._buscar_linhas(inicio, limite, extras) if cabecalho
+                else (pd.DataFrame(), [])
+            )
+            if extras:
+                colunas = valores_extras
+
+            if completa:
+                self.dados = novas
+            elif novas.empty:
+                self.dados = self.dados.iloc[:inicio - 1]
+            else:
+                self.dados = pd.concat([self.dados.iloc[:inicio - 1], novas], ignore_index=True)
+
+            self.total_linhas = len(self.dados)
+            proximo_inicio = max(1, self.total_linhas - self.janela_revalidacao + 1)
+            self.assinatura = self._assinar(colunas, proximo_inicio - 1)
+            self.revisao = revisao
+            self.sincronizacoes += 1
+            return self.dados
+
+
+@st.cache_resource
+def obter_sincronizador() -> SincronizadorPlanilha:
+    """Sincronizador compartilhado, mantido entre expirações do cache de dados."""
     if "gcp_service_account" in st.secrets:
         gc = gspread.service_account_from_dict(st.secrets["gcp_service_account"])
     else:
@@ -28,14 +258,191 @@ def carregar_dados_sheets() -> pd.DataFrame:
     worksheet_name = st.secrets.get("sheets", {}).get("worksheet", WORKSHEET_NAME)
 
     planilha = gc.open_by_url(spreadsheet_url)
-    aba = planilha.worksheet(worksheet_name)
-    dados = aba.get_all_records()
-    return pd.DataFrame(dados)
+    return SincronizadorPlanilha(
+        planilha.worksheet(worksheet_name),
+        selecionar_colunas=colunas_utilizadas,
+        colunas_verificacao=COLUNAS_VERIFICACAO
+    )
+
+
+def _caminho_snapshot() -> str:
+    return st.secrets.get("sheets", {}).get("snapshot", CAMINHO_SNAPSHOT)
+
+
+def caminho_historico() -> str:
+    """Diretório do histórico de indicadores (``st.secrets["historico"]["caminho"]``)."""
+    return st.secrets.get("historico", {}).get("caminho", CAMINHO_HISTORICO)
+
+
+def _carregador():
+    """
+    Função de carga do atualizador: sincroniza e grava o snapshot.
+
+    O sincronizador (autenticação e abertura da planilha) só é criado na
+    primeira carga, para que a versão inicial vinda do snapshot não dependa
+    da API. Se a planilha não mudou, devolve o mesmo DataFrame da carga
+    anterior, sem nova versão.
+    """
+    ultima = {"bruto": None, "dados": None}
+
+    def carregar() -> pd.DataFrame:
+        bruto = obter_sincronizador().sincronizar()
+        if bruto is not ultima["bruto"]:
+            dados = tipar_para_arrow(bruto)
+            salvar_snapshot(dados, _caminho_snapshot())
+            ultima.update(bruto=bruto, dados=dados)
+        return ultima["dados"]
+
+    return carregar
+
+
+@st.cache_resource
+def obter_atualizador() -> AtualizadorDados:
+    """
+    Atualizador compartilhado entre sessões.
+
+    Parte do snapshot local, se houver, para que nem a primeira visita
+    espere pela planilha. A próxima execução da página após uma troca de
+    versão já usa os dados novos.
+    """
+    caminho = _caminho_snapshot()
+    snapshot = ler_snapshot(caminho)
+    return AtualizadorDados(
+        _carregador(),
+        intervalo=st.secrets.get("sheets", {}).get("intervalo_atualizacao", INTERVALO_ATUALIZACAO),
+        inicial=snapshot,
+        inicial_em=(
+            datetime.fromtimestamp(os.path.getmtime(caminho), timezone.utc)
+            if snapshot is not None else None
+        ),
+    )
+
+
+def _com_data(versao: dict) -> pd.DataFrame:
+    df = versao["dados"]
+    df.attrs["atualizado_em"] = versao["atualizado_em"]
+    df.attrs["versao_dados"] = versao["numero"]
+    return df
 
 
+@instrumentar()
+def carregar_dados_sheets() -> pd.DataFrame:
+    """
+    Carrega dados do Google Sheets.
+
+    Devolve a versão atual mantida por ``obter_atualizador``, que é
+    renovada em segundo plano: nenhuma chamada espera pela planilha, exceto
+    a primeira carga sem snapshot. Após a primeira carga, apenas as linhas
+    novas ou recentes são buscadas; se a API falhar, a versão anterior
+    continua em uso. O momento da leitura e o número da versão ficam em
+    ``df.attrs["atualizado_em"]`` e ``df.attrs["versao_dados"]``.
+
+    O DataFrame é o mesmo objeto para todas as sessões (sem a cópia que
+    ``st.cache_data`` faz a cada chamada): é somente leitura, e com
+    Copy-on-Write (pandas 3) qualquer alteração em um derivado não o afeta.
+    
+    Returns:
+        DataFrame com os dados da planilha.
+    """
+    return _com_data(obter_atualizador().versao())
+
+
+def carregar_dados_atualizados() -> pd.DataFrame:
+    """
+    Sincroniza com a planilha agora e devolve os dados.
+
+    Para processos sem o app (ex.: envio ao SeaTalk), que precisam dos
+    dados do momento e não da versão servida em segundo plano.
+
+    Raises:
+        Exception: A falha da sincronização, mesmo havendo snapshot (nunca
+            devolve dados antigos como se fossem atuais)
+    """
+    return _com_data(obter_atualizador().atualizar(estrito=True))
+
+
+def fonte_configurada(sincronizar: bool = False) -> FonteDados:
+    """
+    Fonte definida em ``st.secrets["fonte"]`` (padrão: a planilha).
+
+    Args:
+        sincronizar: Na planilha, sincroniza a cada carga (fora do app)
+    """
+    return criar_fonte(st.secrets.get("fonte", {}), sincronizar=sincronizar)
+
+
+@st.cache_resource(max_entries=4)
+def registrar_historico(chave: tuple, _cubo: pd.DataFrame) -> int:
+    """
+    Grava no histórico horário o cubo de uma versão da fonte, uma vez por
+    ``chave`` (ex.: ``(repr(fonte), versao)``).
+
+    Usa o cubo já construído pela página, com o momento em
+    ``_cubo.attrs["atualizado_em"]`` (ou agora). Uma falha é registrada em
+    log e não impede a exibição dos dados.
+
+    Returns:
+        Número de linhas gravadas (0 em caso de falha)
+    """
+    momento = _cubo.attrs.get("atualizado_em") or datetime.now(timezone.utc)
+    try:
+        return gravar_cubo(_cubo, momento, caminho_historico())
+    except Exception:
+        logger.exception("Falha ao gravar o histórico de indicadores")
+        return 0
+
+
+@st.cache_resource
+def obter_fonte() -> FonteDados:
+    """Fonte de dados do app, compartilhada entre sessões."""
+    return fonte_configurada()
+
+
+def _compactar_contador(serie: pd.Series) -> pd.Series:
+    """Converte contadores para o menor inteiro que comporte os valores."""
+    numeros = pd.to_numeric(serie, errors="coerce")
+    if numeros.isna().any() or not (numeros % 1 == 0).all():
+        return numeros
+    return pd.to_numeric(numeros, downcast="integer")
+
+
+def _converter_data(serie: pd.Series) -> pd.Series:
+    """
+    Converte uma coluna de datas para datetime64.
+
+    A coluna só é convertida se todas as células preenchidas forem
+    reconhecidas como data; caso contrário é mantida como está.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    preenchidas = serie.notna() & (serie != "")
+    datas = pd.to_datetime(serie.where(preenchidas), errors="coerce", dayfirst=True)
+    if datas.notna().sum() != preenchidas.sum():
+        return serie
+    return datas
+
+
+def memoria_mb(df: pd.DataFrame, amostra: int = 10_000) -> float:
+    """
+    Memória ocupada pelo DataFrame, em MB.
+
+    Para frames grandes a medição ``deep`` é feita em uma amostra de linhas
+    espaçadas e extrapolada, pois percorrer todos os objetos é lento.
+    """
+    passo = max(1, len(df) // amostra)
+    medida = df.iloc[::passo].memory_usage(deep=True).sum()
+    return float(medida * passo / 1024 ** 2)
+
+
+@instrumentar()
 def preparar_dados(df: pd.DataFrame) -> pd.DataFrame:
     """
     Prepara e limpa os dados para análise.
+
+    Aplica o esquema do dashboard: colunas de baixa cardinalidade viram
+    categóricas, datas de realização viram datetime64 e contadores viram
+    inteiros compactos. A memória antes/depois fica em
+    ``df.attrs["memoria_mb"]`` e no registro da etapa (instrumentação).
     
     Args:
         df: DataFrame bruto do Google Sheets.
@@ -43,7 +450,31 @@ def preparar_dados(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame com colunas preparadas.
     """
-    df = df.copy()
-    df["total_orders"] = pd.to_numeric(df["total_orders"], errors="coerce")
-    df["operacao_origem"] = df["origin_station_code"].str.split("-").str[0]
+    memoria_antes = memoria_mb(df)
+
+    colunas = {}
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            colunas[col] = df[col].astype("category")
+    for col in COLUNAS_DATA:
+        if col in df.columns:
+            colunas[col] = _converter_data(df[col])
+
+    contadores = ["total_orders"] + [
+        obter_coluna(df, candidatos)
+        for candidatos in (CANDIDATOS_ADERENCIA_CANCELAMENTO, CANDIDATOS_CONTAGEM_CANCELAMENTOS)
+    ]
+    for col in contadores:
+        if col in df.columns:
+            colunas[col] = _compactar_contador(df[col])
+
+    df = df.assign(**colunas)
+
+    estacoes = df["origin_station_code"].astype("category")
+    categorias = estacoes.cat.categories
+    operacoes = pd.Series(categorias, dtype=object).str.split("-").str[0]
+    df["operacao_origem"] = estacoes.map(dict(zip(categorias, operacoes))).astype("category")
+
+    df.attrs["memoria_mb"] = {"antes": memoria_antes, "depois": memoria_mb(df)}
+    anotar(memoria_mb=df.attrs["memoria_mb"])
     return df
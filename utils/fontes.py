@@ -0,0 +1,332 @@
+"""
+Fontes de dados do Resumo Geral.
+
+A página trabalha sobre o cubo agregado (``criar_cubo``). Cada fonte sabe
+carregar as viagens e montar esse cubo:
+
+- ``FontePlanilha``: a aba do Google Sheets (padrão);
+- ``FonteArquivo``: um CSV ou Parquet local;
+- ``FonteSQLite`` e ``FonteDuckDB``: uma tabela em banco embarcado. Nelas a
+  agregação por operação × estação × regional × status é feita no próprio
+  banco (``GROUP BY``), sem trazer as viagens para o pandas.
+
+A fonte é escolhida por configuração (``criar_fonte``), por exemplo em
+``st.secrets``::
+
+    [fonte]
+    tipo = "duckdb"
+    caminho = "dados/viagens.duckdb"
+    tabela = "viagens"
+
+DuckDB é opcional: só é importado quando a fonte é usada.
+"""
+import glob
+import os
+import re
+import sqlite3
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from .agregacoes import (
+    CANDIDATOS_ADERENCIA_CANCELAMENTO,
+    CANDIDATOS_CONTAGEM_CANCELAMENTOS,
+    CHAVES_CUBO,
+    criar_cubo,
+    resolver_coluna,
+)
+from .instrumentacao import instrumentar
+
+# Tabela padrão nas fontes SQL
+TABELA_PADRAO = "viagens"
+
+
+class FonteDados(ABC):
+    """
+    Fonte de viagens no esquema da aba ``db``.
+
+    Subclasses implementam ``carregar``; ``criar_cubo`` agrega em pandas,
+    a menos que a fonte saiba fazer a agregação por conta própria.
+    """
+
+    nome = "fonte"
+
+    @abstractmethod
+    def carregar(self) -> pd.DataFrame:
+        """Viagens brutas, no formato de ``carregar_dados_sheets``."""
+
+    def versao(self):
+        """
+        Identifica a versão atual dos dados (chave de cache do cubo).
+
+        None quando a fonte não sabe dizer: o cubo não deve ser guardado.
+        """
+        return None
+
+    def atualizado_em(self) -> datetime | None:
+        """Momento em que os dados atuais foram gravados/lidos."""
+        return None
+
+    def criar_cubo(self) -> pd.DataFrame:
+        """Cubo agregado (mesmo resultado de ``criar_cubo(preparar_dados(...))``)."""
+        from .data_loader import preparar_dados
+
+        cubo = criar_cubo(preparar_dados(self.carregar()))
+        cubo.attrs["atualizado_em"] = self.atualizado_em()
+        return cubo
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.nome})"
+
+
+class FontePlanilha(FonteDados):
+    """
+    A aba do Google Sheets, via ``carregar_dados_sheets``.
+
+    Com ``sincronizar=True`` cada carga sincroniza com a planilha na hora
+    (processos sem o app, ex.: envio ao SeaTalk).
+    """
+
+    nome = "sheets"
+
+    def __init__(self, sincronizar: bool = False):
+        self.sincronizar = sincronizar
+
+    def carregar(self) -> pd.DataFrame:
+        from . import data_loader
+
+        if self.sincronizar:
+            return data_loader.carregar_dados_atualizados()
+        return data_loader.carregar_dados_sheets()
+
+    def versao(self):
+        return self.carregar().attrs.get("versao_dados")
+
+    def criar_cubo(self) -> pd.DataFrame:
+        from .data_loader import preparar_dados
+
+        dados = self.carregar()
+        cubo = criar_cubo(preparar_dados(dados))
+        cubo.attrs["atualizado_em"] = dados.attrs.get("atualizado_em")
+        return cubo
+
+
+class _FonteEmArquivo(FonteDados):
+    """Fonte gravada em um arquivo local: a versão segue a modificação do arquivo."""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.nome = caminho
+
+    def versao(self):
+        estado = os.stat(self.caminho)
+        return (estado.st_mtime_ns, estado.st_size)
+
+    def atualizado_em(self) -> datetime | None:
+        return datetime.fromtimestamp(os.path.getmtime(self.caminho), timezone.utc)
+
+
+class FonteArquivo(_FonteEmArquivo):
+    """CSV ou Parquet local (formato pela extensão, ou ``formato``)."""
+
+    def __init__(self, caminho: str, formato: str | None = None):
+        super().__init__(caminho)
+        self.formato = (formato or os.path.splitext(caminho)[1].lstrip(".")).lower()
+        if self.formato not in ("csv", "parquet"):
+            raise ValueError(f"Formato de arquivo não suportado: {caminho}")
+
+    @instrumentar("carregar_arquivo")
+    def carregar(self) -> pd.DataFrame:
+        if self.formato == "parquet":
+            return pd.read_parquet(self.caminho)
+        return pd.read_csv(self.caminho)
+
+
+def _identificador(nome: str) -> str:
+    return '"' + str(nome).replace('"', '""') + '"'
+
+
+def sql_cubo(colunas: list, tabela: str) -> str | None:
+    """
+    Consulta que monta o cubo no banco, ou None sem ``origin_station_code``.
+
+    Reproduz ``criar_cubo`` sobre ``preparar_dados``: operação = prefixo do
+    código da estação, viagem = ``trip_number`` preenchido, realizado =
+    data não nula e não vazia, e cancelamento só quando as duas colunas
+    existem. ``tabela`` é inserida como está (nome ou expressão, ex.:
+    ``read_parquet('viagens/*.parquet')`` no DuckDB).
+    """
+    if "origin_station_code" not in colunas:
+        return None
+
+    estacao = _identificador("origin_station_code")
+    operacao = (
+        f"CASE WHEN instr({estacao}, '-') > 0 "
+        f"THEN substr({estacao}, 1, instr({estacao}, '-') - 1) ELSE {estacao} END"
+    )
+    chaves = {"operacao_origem": operacao}
+    chaves.update({
+        col: _identificador(col)
+        for col in CHAVES_CUBO if col != "operacao_origem" and col in colunas
+    })
+
+    viagem = f"{_identificador('trip_number')} IS NOT NULL"
+
+    def contar(condicao: str) -> str:
+        return f"CAST(SUM(CASE WHEN {condicao} THEN 1 ELSE 0 END) AS BIGINT)"
+
+    def realizado(coluna: str) -> str:
+        return f"{_identificador(coluna)} IS NOT NULL AND CAST({_identificador(coluna)} AS VARCHAR) <> ''"
+
+    medidas = {"viagens": contar(viagem)}
+    col_aderencia = resolver_coluna(colunas, CANDIDATOS_ADERENCIA_CANCELAMENTO)
+    col_contagem = resolver_coluna(colunas, CANDIDATOS_CONTAGEM_CANCELAMENTOS)
+    if col_aderencia and col_contagem:
+        medidas["soma_aderencia_cancelamento"] = f"COALESCE(SUM({_identificador(col_aderencia)}), 0)"
+        medidas["contagem_cancelamentos"] = f"COALESCE(SUM({_identificador(col_contagem)}), 0)"
+    for prefixo, data, status in (
+        ("CPT", "cpt_origin_realized", "status_cpt"),
+        ("ETA", "eta_origin_realized", "status_eta"),
+    ):
+        if data in colunas and status in colunas:
+            medidas[f"{prefixo} Delay"] = contar(f"{realizado(data)} AND {_identificador(status)} = 'DELAY'")
+            medidas[f"{prefixo} Trips"] = contar(f"{realizado(data)} AND {viagem}")
+
+    selecao = [f"{expressao} AS {_identificador(nome)}" for nome, expressao in chaves.items()]
+    selecao += [f"{expressao} AS {_identificador(nome)}" for nome, expressao in medidas.items()]
+    agrupamento = ", ".join(chaves.values())
+    return (
+        f"SELECT {', '.join(selecao)} FROM {tabela} "
+        f"WHERE {estacao} IS NOT NULL "
+        f"GROUP BY {agrupamento} ORDER BY {agrupamento}"
+    )
+
+
+class FonteSQL(_FonteEmArquivo):
+    """
+    Tabela de um banco embarcado, com a agregação feita em SQL.
+
+    Subclasses implementam ``consultar``.
+    """
+
+    def __init__(self, caminho: str, tabela: str = TABELA_PADRAO):
+        super().__init__(caminho)
+        self.tabela = tabela
+        self.nome = f"{caminho}:{tabela}"
+
+    @abstractmethod
+    def consultar(self, sql: str) -> pd.DataFrame:
+        """Resultado de ``sql`` como DataFrame."""
+
+    def colunas(self) -> list:
+        return list(self.consultar(f"SELECT * FROM {self.tabela} LIMIT 0").columns)
+
+    @instrumentar("carregar_sql")
+    def carregar(self) -> pd.DataFrame:
+        return self.consultar(f"SELECT * FROM {self.tabela}")
+
+    @instrumentar("criar_cubo_sql")
+    def criar_cubo(self) -> pd.DataFrame:
+        sql = sql_cubo(self.colunas(), self.tabela)
+        if sql is None:
+            return super().criar_cubo()
+        cubo = self.consultar(sql)
+        # Chaves como texto (object), igual ao cubo montado em pandas
+        chaves = [col for col in CHAVES_CUBO if col in cubo.columns]
+        cubo = cubo.astype({col: object for col in chaves})
+        cubo.attrs["atualizado_em"] = self.atualizado_em()
+        return cubo
+
+
+class FonteSQLite(FonteSQL):
+    """Tabela em um arquivo SQLite (aberto somente para leitura)."""
+
+    def consultar(self, sql: str) -> pd.DataFrame:
+        conexao = sqlite3.connect(f"file:{self.caminho}?mode=ro", uri=True)
+        try:
+            return pd.read_sql_query(sql, conexao)
+        finally:
+            conexao.close()
+
+
+def arquivos_da_expressao(tabela: str) -> list[str]:
+    """Arquivos citados (entre aspas simples, com glob) em uma expressão de tabela."""
+    arquivos = set()
+    for padrao in re.findall(r"'([^']+)'", tabela):
+        arquivos.update(glob.glob(padrao, recursive=True))
+    return sorted(arquivos)
+
+
+class FonteDuckDB(FonteSQL):
+    """
+    Tabela em um arquivo DuckDB (somente leitura).
+
+    Sem ``caminho``, usa um banco em memória: ``tabela`` pode então ser uma
+    expressão sobre arquivos, ex.: ``read_parquet('historico/*.parquet')``;
+    a versão segue os arquivos que a expressão encontra.
+    """
+
+    def consultar(self, sql: str) -> pd.DataFrame:
+        try:
+            import duckdb
+        except ImportError as erro:
+            raise ImportError("A fonte DuckDB requer o pacote duckdb (pip install duckdb)") from erro
+
+        if self.caminho:
+            conexao = duckdb.connect(self.caminho, read_only=True)
+        else:
+            conexao = duckdb.connect()
+        try:
+            return conexao.execute(sql).df()
+        finally:
+            conexao.close()
+
+    def _estado_arquivos(self) -> list[tuple]:
+        estados = []
+        for arquivo in arquivos_da_expressao(self.tabela):
+            estado = os.stat(arquivo)
+            estados.append((arquivo, estado.st_mtime_ns, estado.st_size))
+        return estados
+
+    def versao(self):
+        if self.caminho:
+            return super().versao()
+        return tuple(self._estado_arquivos()) or None
+
+    def atualizado_em(self) -> datetime | None:
+        if self.caminho:
+            return super().atualizado_em()
+        estados = self._estado_arquivos()
+        if not estados:
+            return None
+        return datetime.fromtimestamp(max(mtime for _, mtime, _ in estados) / 1e9, timezone.utc)
+
+
+def criar_fonte(config: dict | None = None, sincronizar: bool = False) -> FonteDados:
+    """
+    Fonte a partir da configuração.
+
+    Args:
+        config: ``tipo`` ("sheets", "csv", "parquet", "sqlite" ou "duckdb"),
+            ``caminho`` e, nas fontes SQL, ``tabela``. Vazio = planilha.
+        sincronizar: Na planilha, sincroniza a cada carga (fora do app)
+
+    Raises:
+        ValueError: Tipo desconhecido ou sem ``caminho``
+    """
+    config = dict(config or {})
+    tipo = str(config.get("tipo", "sheets")).lower()
+    caminho = config.get("caminho", "")
+
+    if tipo == "sheets":
+        return FontePlanilha(sincronizar=sincronizar)
+    if tipo == "duckdb":
+        return FonteDuckDB(caminho, config.get("tabela", TABELA_PADRAO))
+    if not caminho:
+        raise ValueError(f"A fonte '{tipo}' exige 'caminho'")
+    if tipo in ("csv", "parquet"):
+        return FonteArquivo(caminho, tipo)
+    if tipo == "sqlite":
+        return FonteSQLite(caminho, config.get("tabela", TABELA_PADRAO))
+    raise ValueError(f"Tipo de fonte desconhecido: {tipo}")
@@ -0,0 +1,225 @@
+"""
+Histórico horário dos indicadores do Resumo Geral.
+
+A cada nova versão dos dados, qualquer que seja a fonte (``gravar_cubo``,
+chamado com o cubo que a página constrói para a versão), as tabelas
+agregadas por estação e por regional
+(``criar_tabela_detalhada_por_grupo``) são gravadas em Parquet,
+com ``momento`` truncado na hora. O histórico guarda só os indicadores
+(``KPIS_HISTORICO``), nunca as viagens, e as consultas de tendência leem
+apenas ele.
+
+Layout em disco: um diretório por nível e um arquivo por dia
+(``estacao/AAAA-MM-DD.parquet``). Gravar uma hora reescreve só o arquivo do
+dia, substituindo a mesma hora se já existir (a última versão da hora
+vale); os dias anteriores não mudam. Uma consulta abre apenas os arquivos
+do nível e do período pedidos, e só as colunas usadas.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from .resumo_geral import montar_tabelas
+
+# Diretório padrão (pode ser sobrescrito em st.secrets["historico"]["caminho"])
+CAMINHO_HISTORICO = "historico"
+
+# Indicadores gravados por hora
+KPIS_HISTORICO = ["Total", "% CPT", "% ETA", "%Cancel Nok"]
+
+# Nível do histórico -> (tabela de ``montar_tabelas``, coluna do agrupamento)
+NIVEIS_HISTORICO = {"estacao": ("detalhado", "Estação"), "regional": ("regional", "Regional")}
+
+COLUNAS_CHAVE = ["momento", "operacao", "grupo"]
+
+# Acima deste período, as tendências usam a média diária
+DIAS_SERIE_HORARIA = 7
+
+# Prefixo das colunas com a série de cada indicador (sparklines)
+PREFIXO_SERIE = "Tendência "
+
+
+def _arquivo_dia(caminho: str, nivel: str, dia) -> str:
+    return os.path.join(caminho, nivel, f"{dia:%Y-%m-%d}.parquet")
+
+
+def _compactar(df: pd.DataFrame) -> pd.DataFrame:
+    """Tipos compactos: textos como categoria, indicadores em float32."""
+    tipos = {"momento": "datetime64[us, UTC]", "operacao": "category", "grupo": "category"}
+    tipos.update({col: "float32" for col in KPIS_HISTORICO if col != "Total"})
+    tipos["Total"] = "int32"
+    return df.astype(tipos)
+
+
+def tabela_historico(df_tabela: pd.DataFrame, grupo_col: str, momento: datetime) -> pd.DataFrame:
+    """
+    Linhas do histórico a partir de uma tabela de ``montar_tabelas``.
+
+    Args:
+        df_tabela: Tabela por operação e ``grupo_col``, sem filtros
+        grupo_col: Coluna do agrupamento ("Estação" ou "Regional")
+        momento: Momento dos dados; é truncado na hora, em UTC
+
+    Returns:
+        DataFrame com ``COLUNAS_CHAVE`` seguido de ``KPIS_HISTORICO``
+    """
+    df = pd.DataFrame({
+        "momento": pd.Timestamp(momento).tz_convert("UTC").floor("h"),
+        "operacao": df_tabela["Operação"].astype(str).to_numpy(),
+        "grupo": df_tabela[grupo_col].astype(str).to_numpy(),
+    })
+    for col in KPIS_HISTORICO:
+        df[col] = df_tabela[col].to_numpy() if col in df_tabela.columns else 0
+    return _compactar(df)
+
+
+def gravar_historico(tabelas: dict, momento: datetime, caminho: str = CAMINHO_HISTORICO) -> int:
+    """
+    Grava as tabelas da hora de ``momento`` nos arquivos do dia (atômico).
+
+    Args:
+        tabelas: Resultado de ``montar_tabelas`` sobre o cubo completo
+        momento: Momento dos dados
+        caminho: Diretório do histórico
+
+    Returns:
+        Número de linhas gravadas
+    """
+    gravadas = 0
+    for nivel, (chave, grupo_col) in NIVEIS_HISTORICO.items():
+        df_tabela = tabelas[chave]
+        if df_tabela.empty or grupo_col not in df_tabela.columns:
+            continue
+        novas = tabela_historico(df_tabela, grupo_col, momento)
+        hora = novas["momento"].iloc[0]
+        arquivo = _arquivo_dia(caminho, nivel, hora)
+        os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+        if os.path.exists(arquivo):
+            anteriores = pd.read_parquet(arquivo)
+            dia = pd.concat([anteriores[anteriores["momento"] != hora], novas], ignore_index=True)
+            dia = _compactar(dia)
+        else:
+            dia = novas
+
+        temporario = f"{arquivo}.tmp"
+        dia.sort_values(COLUNAS_CHAVE).to_parquet(temporario, index=False, compression="zstd")
+        os.replace(temporario, arquivo)
+        gravadas += len(novas)
+    return gravadas
+
+
+def gravar_cubo(cubo: pd.DataFrame, momento: datetime, caminho: str = CAMINHO_HISTORICO) -> int:
+    """Grava a hora de ``momento`` a partir do cubo completo (sem filtros)."""
+    return gravar_historico(montar_tabelas(cubo), momento, caminho)
+
+
+def _arquivos(caminho: str, nivel: str) -> list:
+    diretorio = os.path.join(caminho, nivel)
+    if not os.path.isdir(diretorio):
+        return []
+    arquivos = [
+        entrada for entrada in os.scandir(diretorio)
+        if entrada.is_file() and entrada.name.endswith(".parquet")
+    ]
+    return sorted(arquivos, key=lambda entrada: entrada.name)
+
+
+def versao_historico(caminho: str = CAMINHO_HISTORICO) -> tuple:
+    """Identifica o estado do histórico (chave de cache das consultas)."""
+    return tuple(
+        (nivel, entrada.name, entrada.stat().st_mtime_ns)
+        for nivel in NIVEIS_HISTORICO
+        for entrada in _arquivos(caminho, nivel)
+    )
+
+
+def ler_historico(
+    nivel: str,
+    caminho: str = CAMINHO_HISTORICO,
+    dias: int | None = None,
+    colunas: list | None = None,
+    agora: datetime | None = None
+) -> pd.DataFrame:
+    """
+    Lê o histórico de um nível nos últimos ``dias`` (todo, se None).
+
+    Args:
+        nivel: "estacao" ou "regional"
+        caminho: Diretório do histórico
+        dias: Período, contado a partir de ``agora``
+        colunas: Indicadores lidos (padrão: ``KPIS_HISTORICO``)
+
+    Returns:
+        DataFrame ordenado por ``momento``; vazio se não houver histórico
+    """
+    colunas = COLUNAS_CHAVE + (colunas or KPIS_HISTORICO)
+    arquivos = _arquivos(caminho, nivel)
+    filtro = None
+    if dias is not None:
+        inicio = pd.Timestamp(agora or datetime.now(timezone.utc)).tz_convert("UTC") - timedelta(days=dias)
+        primeiro = f"{inicio:%Y-%m-%d}.parquet"
+        arquivos = [entrada for entrada in arquivos if entrada.name >= primeiro]
+        filtro = ds.field("momento") >= inicio
+    if not arquivos:
+        return pd.DataFrame(columns=colunas)
+
+    tabela = ds.dataset([entrada.path for entrada in arquivos], format="parquet").to_table(
+        columns=colunas, filter=filtro
+    )
+    return tabela.to_pandas().sort_values("momento", kind="stable", ignore_index=True)
+
+
+def _pontos(historico: pd.DataFrame, kpis: list, dias: int | None) -> pd.DataFrame:
+    """Pontos das séries: horários, ou médias diárias acima de ``DIAS_SERIE_HORARIA``."""
+    if dias is not None and dias <= DIAS_SERIE_HORARIA:
+        return historico[COLUNAS_CHAVE + kpis]
+    return (
+        historico.assign(momento=historico["momento"].dt.floor("D"))
+        .groupby(COLUNAS_CHAVE, observed=True)[kpis]
+        .mean()
+        .reset_index()
+    )
+
+
+def series_tendencia(historico: pd.DataFrame, kpis: list, dias: int | None = None) -> pd.DataFrame:
+    """
+    Valor atual e série de cada indicador, por operação e grupo.
+
+    Returns:
+        DataFrame com ``operacao``, ``grupo`` e, para cada indicador, o
+        último valor (coluna ``kpi``) e a lista de valores em ordem
+        cronológica (``PREFIXO_SERIE + kpi``), para colunas de sparkline
+    """
+    chaves = ["operacao", "grupo"]
+    colunas = [coluna for kpi in kpis for coluna in (kpi, PREFIXO_SERIE + kpi)]
+    if historico.empty:
+        return pd.DataFrame(columns=chaves + colunas)
+
+    atual = historico.groupby(chaves, observed=True)[kpis].last()
+    pontos = _pontos(historico, kpis, dias).sort_values(COLUNAS_CHAVE)
+    agrupado = pontos.groupby(chaves, observed=True)
+    for kpi in kpis:
+        atual[PREFIXO_SERIE + kpi] = agrupado[kpi].agg(list)
+    return atual[colunas].reset_index()
+
+
+def pivotar_tendencia(historico: pd.DataFrame, kpi: str, dias: int | None = None) -> pd.DataFrame:
+    """
+    ``kpi`` em formato largo (``momento`` × grupo), para gráfico de linhas.
+
+    Usa a mesma granularidade de ``series_tendencia``; com mais de uma
+    operação, cada linha é rotulada "operação · grupo".
+    """
+    if historico.empty:
+        return pd.DataFrame()
+    pontos = _pontos(historico, [kpi], dias)
+    rotulos = pontos["grupo"].astype(str)
+    if pontos["operacao"].nunique() > 1:
+        rotulos = pontos["operacao"].astype(str) + " · " + rotulos
+    return (
+        pontos.assign(rotulo=rotulos)
+        .pivot_table(index="momento", columns="rotulo", values=kpi, aggfunc="mean")
+        .sort_index()
+    )
@@ -0,0 +1,137 @@
+"""
+Instrumentação leve do caminho quente do dashboard.
+
+Cada etapa medida (decorador ``instrumentar`` ou contexto ``etapa``)
+registra duração, número de linhas do resultado e, para funções em cache,
+se houve acerto ou falta. Os registros de uma execução da página ficam
+disponíveis em ``medicoes()`` para o painel de depuração; com a variável de
+ambiente ``METRICAS_JSON=true`` cada etapa também é impressa como uma linha
+JSON.
+
+Fora de uma execução iniciada com ``iniciar_execucao`` (ex.: benchmarks,
+envio do SeaTalk) nada é acumulado.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+LOG_JSON = os.getenv("METRICAS_JSON", "false").lower() == "true"
+
+# Cada execucao do script roda em uma thread propria do Streamlit
+_estado = threading.local()
+
+
+def iniciar_execucao():
+    """Começa a acumular as medições da execução atual da página."""
+    _estado.registros = []
+    _estado.pilha = []
+    _estado.inicio = time.perf_counter()
+
+
+def medicoes() -> list[dict]:
+    """Medições da execução atual, na ordem em que terminaram."""
+    return list(getattr(_estado, "registros", None) or [])
+
+
+def duracao_execucao() -> float | None:
+    """Segundos desde ``iniciar_execucao``."""
+    inicio = getattr(_estado, "inicio", None)
+    return None if inicio is None else time.perf_counter() - inicio
+
+
+def contar_linhas(resultado) -> int | None:
+    """Linhas de um DataFrame (ou do primeiro elemento de uma tupla)."""
+    if isinstance(resultado, tuple) and resultado:
+        resultado = resultado[0]
+    if isinstance(resultado, (pd.DataFrame, pd.Series)):
+        return len(resultado)
+    return None
+
+
+@contextmanager
+def etapa(nome: str, **extras):
+    """
+    Mede um trecho de código.
+
+    Produz o registro (dict) da etapa, que pode ser completado dentro do
+    bloco (ex.: ``registro["linhas"] = len(df)``).
+    """
+    pilha = getattr(_estado, "pilha", None)
+    if pilha is None:
+        pilha = _estado.pilha = []
+    registro = {"etapa": nome, "nivel": len(pilha), "linhas": None, "cache": None, **extras}
+    pilha.append(registro)
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro["segundos"] = time.perf_counter() - inicio
+        pilha.pop()
+        registros = getattr(_estado, "registros", None)
+        if registros is not None:
+            registros.append(registro)
+        if LOG_JSON:
+            print(json.dumps({"evento": "etapa", **registro}, default=str))
+
+
+def anotar(**extras):
+    """Acrescenta ``extras`` ao registro da etapa aberta mais interna."""
+    pilha = getattr(_estado, "pilha", None)
+    if pilha:
+        pilha[-1].update(extras)
+
+
+def _marcar_execucao():
+    # A funcao em cache executou: falta no cache da etapa aberta mais interna
+    pilha = getattr(_estado, "pilha", None)
+    if pilha:
+        pilha[-1]["cache"] = "falta"
+
+
+def instrumentar(nome: str | None = None, cache=None):
+    """
+    Decorador que mede cada chamada da função.
+
+    As linhas registradas são as do resultado ou, se ele não for uma
+    tabela, as do primeiro argumento (ex.: a tabela renderizada).
+
+    Args:
+        nome: Nome da etapa (padrão: nome da função)
+        cache: Decorador de cache a aplicar (ex.: ``st.cache_data(ttl=3600)``).
+            A etapa registra "acerto" ou "falta" conforme a função tenha
+            executado ou não.
+    """
+    def decorador(funcao):
+        nome_etapa = nome or funcao.__name__
+        chamada = funcao
+
+        if cache is not None:
+            @functools.wraps(funcao)
+            def executar(*args, **kwargs):
+                _marcar_execucao()
+                return funcao(*args, **kwargs)
+
+            chamada = cache(executar)
+
+        @functools.wraps(funcao)
+        def medido(*args, **kwargs):
+            with etapa(nome_etapa) as registro:
+                if cache is not None:
+                    registro["cache"] = "acerto"
+                resultado = chamada(*args, **kwargs)
+                registro["linhas"] = contar_linhas(resultado)
+                if registro["linhas"] is None and args:
+                    registro["linhas"] = contar_linhas(args[0])
+            return resultado
+
+        # Mantem a API do cache (ex.: .clear())
+        if hasattr(chamada, "clear"):
+            medido.clear = chamada.clear
+        return medido
+
+    return decorador
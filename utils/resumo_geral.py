@@ -0,0 +1,242 @@
+"""
+Montagem das tabelas exibidas no Resumo Geral.
+
+Funções puras (sem chamadas ao Streamlit), usadas pela página e pela
+renderização das imagens enviadas ao SeaTalk.
+"""
+import numpy as np
+import pandas as pd
+from matplotlib import colormaps
+
+from .agregacoes import (
+    criar_pivot_por_operacao,
+    criar_tabela_consolidada_por_grupo,
+    criar_tabela_detalhada,
+    criar_tabela_detalhada_por_grupo,
+)
+from .instrumentacao import instrumentar
+
+COLUNAS_EXCLUIR = [
+    "% Created",
+    "% Assigning",
+    "% Assigned",
+    "% Arrived",
+    "% Loading",
+    "% Departed",
+    "% Seal",
+    "% fechada",
+    "% Unseal",
+    "",
+    "%",
+]
+
+ORDEM_COLUNAS = [
+    "Estação",
+    "Total",
+    "Created",
+    "Assigning",
+    "Assigned",
+    "Arrived",
+    "Loading",
+    "Departed",
+    "Seal",
+    "fechada",
+    "Cancelled",
+    "No show",
+    "% No show",
+    "%cancelado",
+    "%Cancel Nok",
+    "% fechada",
+    "% ETA",
+    "ETA Trips",
+    "ETA Delay",
+    "CPT Trips",
+    "CPT Delay",
+    "% CPT",
+]
+
+ORDEM_COLUNAS_REGIONAL = [
+    "Regional",
+    "Total",
+    "Created",
+    "Assigning",
+    "Assigned",
+    "Arrived",
+    "Loading",
+    "Departed",
+    "Seal",
+    "fechada",
+    "No show",
+    "% No show",
+    "Cancelled",
+    "%cancelado",
+    "%Cancel Nok",
+    "% fechada",
+    "% ETA",
+    "ETA Trips",
+    "ETA Delay",
+    "CPT Trips",
+    "CPT Delay",
+    "% CPT",
+    "soma_aderencia_cancelamento",
+    "contagem_cancelamentos",
+]
+
+# Limiar de luminância do Styler.background_gradient para texto claro
+LIMIAR_TEXTO_CLARO = 0.408
+
+
+def normalizar_coluna_exibicao(nome: str) -> str:
+    return (
+        nome.strip()
+        .lower()
+        .replace(" ", "")
+        .replace("_", "")
+        .replace("%", "pct")
+    )
+
+
+def ordenar_colunas(df_base: pd.DataFrame, ordem: list) -> list:
+    mapa = {normalizar_coluna_exibicao(col): col for col in df_base.columns}
+    colunas = []
+    for col in ordem:
+        chave = normalizar_coluna_exibicao(col)
+        if chave in mapa:
+            colunas.append(mapa[chave])
+    return colunas
+
+
+def criar_format_dict(df_tabela: pd.DataFrame) -> dict:
+    """Formatos de exibição: porcentagens com 2 casas, contagens inteiras."""
+    format_dict = {"Total": "{:,.0f}"}
+    for col in df_tabela.columns:
+        if col.startswith("%"):
+            format_dict[col] = "{:.2f}%"
+        elif col not in ["Operação", "Estação", "Total"]:
+            format_dict[col] = "{:,.0f}"
+    return format_dict
+
+
+@instrumentar()
+def montar_tabelas(cubo: pd.DataFrame) -> dict:
+    """
+    Monta as tabelas da página a partir do cubo (já filtrado).
+
+    Returns:
+        Dict com ``detalhado`` (por estação), ``regional`` (por operação e
+        regional), ``regional_consolidado`` (regional somando operações),
+        ``format`` e as colunas de porcentagem de cada tabela.
+    """
+    _, status_cols = criar_pivot_por_operacao(cubo)
+
+    df_detalhado, _ = criar_tabela_detalhada(cubo, status_cols)
+    df_regional, _ = criar_tabela_detalhada_por_grupo(
+        cubo, status_cols, "regional", "Regional"
+    )
+    df_regional_consolidado = criar_tabela_consolidada_por_grupo(
+        cubo, "regional", "Regional"
+    )
+
+    df_detalhado = df_detalhado[["Operação"] + ordenar_colunas(df_detalhado, ORDEM_COLUNAS)]
+    df_regional = df_regional[
+        ["Operação"] + ordenar_colunas(df_regional, ORDEM_COLUNAS_REGIONAL)
+    ]
+
+    return {
+        "detalhado": df_detalhado,
+        "regional": df_regional,
+        "regional_consolidado": df_regional_consolidado,
+        "format": criar_format_dict(df_detalhado),
+        "colunas_pct": [col for col in df_detalhado.columns if col.startswith("%")],
+        "colunas_pct_regional": [col for col in df_regional.columns if col.startswith("%")],
+    }
+
+
+def tabela_regional(tabelas: dict, operacao: str) -> pd.DataFrame | None:
+    """
+    Tabela por regional de uma operação, ou de todas se ``operacao`` vazio.
+
+    Returns:
+        DataFrame sem a coluna Operação, ou None se não houver regional.
+    """
+    df_tabela = tabelas["regional"]
+    if "Operação" not in df_tabela.columns or "Regional" not in df_tabela.columns:
+        return None
+
+    if operacao:
+        return df_tabela[df_tabela["Operação"] == operacao].drop(columns=["Operação"])
+
+    # Regionais somadas sobre todas as operações, derivadas do cubo
+    df_consolidado = tabelas["regional_consolidado"]
+    colunas = [
+        col for col in df_tabela.columns
+        if col != "Operação" and col in df_consolidado.columns
+    ]
+    return df_consolidado[colunas]
+
+
+def tabela_por_operacao(
+    tabelas: dict,
+    operacao: str,
+    ordenar_total_desc: bool = False
+) -> pd.DataFrame:
+    """Tabela por estação de uma operação."""
+    df_tabela = tabelas["detalhado"]
+    df_filtrado = df_tabela[df_tabela["Operação"] == operacao].drop(columns=["Operação"])
+    if ordenar_total_desc and "Total" in df_filtrado.columns:
+        df_filtrado = df_filtrado.sort_values("Total", ascending=False)
+    return df_filtrado
+
+
+def cores_gradiente(serie: pd.Series, cmap: str = "Reds") -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cores de fundo e de texto equivalentes a ``Styler.background_gradient``.
+
+    Returns:
+        Tupla (RGBA de fundo, RGBA do texto), um por valor da série.
+    """
+    valores = pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float)
+    minimo, maximo = np.nanmin(valores, initial=np.inf), np.nanmax(valores, initial=-np.inf)
+    amplitude = maximo - minimo
+    if np.isfinite(amplitude) and amplitude > 0:
+        normalizados = (valores - minimo) / amplitude
+    else:
+        normalizados = np.zeros_like(valores)
+    fundo = colormaps[cmap](normalizados)
+
+    # Luminância relativa (WCAG), como no Styler
+    rgb = np.where(fundo[:, :3] <= 0.04045, fundo[:, :3] / 12.92, ((fundo[:, :3] + 0.055) / 1.055) ** 2.4)
+    luminancia = rgb @ np.array([0.2126, 0.7152, 0.0722])
+    texto = np.where(
+        (luminancia < LIMIAR_TEXTO_CLARO)[:, None],
+        np.array([0xF1, 0xF1, 0xF1, 0xFF]) / 255,
+        np.array([0.0, 0.0, 0.0, 1.0]),
+    )
+    return fundo, texto
+
+
+def _hex(cores: np.ndarray) -> np.ndarray:
+    rgb = np.round(cores[:, :3] * 255).astype(int)
+    return np.array([f"#{r:02x}{g:02x}{b:02x}" for r, g, b in rgb])
+
+
+def estilos_gradiente(df: pd.DataFrame, colunas: list, cmap: str = "Reds") -> pd.DataFrame:
+    """
+    CSS por célula equivalente a ``background_gradient(axis=0)`` nas ``colunas``.
+
+    As cores de cada coluna são calculadas de uma vez (``cores_gradiente``);
+    o resultado serve para ``Styler.apply(axis=None)``.
+    """
+    estilos = pd.DataFrame("", index=df.index, columns=df.columns)
+    if df.empty:
+        return estilos
+    for col in colunas:
+        if col not in df.columns:
+            continue
+        fundo, texto = cores_gradiente(df[col], cmap)
+        css = np.char.add(
+            np.char.add("background-color: ", _hex(fundo)),
+            np.char.add("; color: ", _hex(texto)),
+        )
+        estilos[col] = np.where(df[col].notna().to_numpy(), css, "")
+    return estilos
@@ -0,0 +1,63 @@
+"""
+Snapshot local em disco dos dados da planilha.
+
+Os dados são gravados em Feather (Arrow IPC, sem compressão) para que a
+leitura na partida do app use memory-map e dispense a ida ao Google Sheets.
+"""
+import os
+
+import pandas as pd
+import pyarrow.feather as feather
+
+# Caminho padrão do snapshot (pode ser sobrescrito em st.secrets["sheets"]["snapshot"])
+CAMINHO_SNAPSHOT = os.path.join("snapshots", "db.feather")
+
+# Resultados de pandas.api.types.infer_dtype tratados como numéricos
+TIPOS_NUMERICOS = {"integer", "floating", "mixed-integer-float", "empty"}
+
+
+def tipar_para_arrow(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte colunas mistas de ``get_all_records`` em tipos do Arrow.
+
+    Colunas ``object`` cujos valores preenchidos são todos numéricos viram
+    numéricas (células vazias viram NaN); as demais viram texto.
+
+    Args:
+        df: DataFrame bruto da planilha.
+
+    Returns:
+        DataFrame com colunas serializáveis em Feather.
+    """
+    colunas = {}
+    for col in df.columns[df.dtypes == object]:
+        serie = df[col]
+        preenchidos = serie[serie.notna() & (serie != "")]
+        if pd.api.types.infer_dtype(preenchidos, skipna=True) in TIPOS_NUMERICOS:
+            colunas[col] = pd.to_numeric(serie.mask(serie == ""), errors="coerce")
+        else:
+            colunas[col] = serie.where(serie.isna(), serie.astype(str))
+    return df.assign(**colunas) if colunas else df
+
+
+def salvar_snapshot(df: pd.DataFrame, caminho: str = CAMINHO_SNAPSHOT) -> None:
+    """Grava o snapshot de forma atômica (arquivo temporário + rename)."""
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    feather.write_feather(df.reset_index(drop=True), temporario, compression="uncompressed")
+    os.replace(temporario, caminho)
+
+
+def ler_snapshot(caminho: str = CAMINHO_SNAPSHOT) -> pd.DataFrame | None:
+    """
+    Lê o snapshot via memory-map.
+
+    Returns:
+        DataFrame do snapshot, ou None se não existir ou estiver corrompido.
+    """
+    if not os.path.exists(caminho):
+        return None
+    try:
+        return feather.read_table(caminho, memory_map=True).to_pandas()
+    except (OSError, ValueError):
+        return None